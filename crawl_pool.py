@@ -0,0 +1,258 @@
+import os
+import sys
+import time
+import queue
+import asyncio
+import argparse
+import multiprocessing as mp
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Optional
+
+from image_transcode import check_transcode
+from playwright_crawl import GoogleMapsCrawler
+
+try:
+    import psutil
+except ImportError:  # psutil là tùy chọn, thiếu thì chỉ recycle theo số địa chỉ
+    psutil = None
+
+# Khởi động lại browser sau chừng này địa chỉ / khi RSS (MB) vượt ngưỡng
+DEFAULT_RECYCLE_AFTER = 25
+DEFAULT_MAX_RSS_MB = 1500
+
+
+def process_tree_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """RSS (MB) của process và toàn bộ process con (Chromium), None nếu không có psutil."""
+    if psutil is None:
+        return None
+    try:
+        proc = psutil.Process(pid)
+        procs = [proc] + proc.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for p in procs:
+        try:
+            total += p.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
+
+
+async def _close_quietly(crawler, worker_id: int):
+    # Lỗi khi đóng browser không được làm mất thông tin worker đã nhận sentinel
+    try:
+        await crawler.close()
+    except Exception as e:
+        print(f"⚠️ Worker {worker_id}: lỗi khi đóng browser: {str(e)}")
+
+
+async def _worker_loop(worker_id: int, tasks, results, max_images: int, output_dir: str,
+                       headless: bool, recycle_after: int, max_rss_mb: Optional[float],
+                       transcode: Optional[str], http_first: bool, budget_ms: Optional[float]) -> bool:
+    def new_crawler():
+        # Mỗi worker chỉ dùng 1 process nén ảnh, các worker đã chia nhau số core
+        return GoogleMapsCrawler(headless=headless, transcode=transcode, transcode_workers=1,
+                                 http_first=http_first)
+
+    crawler = new_crawler()
+    await crawler.start()
+    handled = 0
+    try:
+        while True:
+            address = tasks.get()
+            if address is None:
+                return True
+
+            results.put({'type': 'started', 'worker': worker_id, 'address': address})
+            started = time.time()
+            try:
+                count = await crawler.crawl(address, max_images, output_dir, budget_ms=budget_ms)
+                results.put({'type': 'result', 'worker': worker_id, 'address': address,
+                             'count': int(count), 'partial': count.partial, 'error': None,
+                             'seconds': round(time.time() - started, 2)})
+            except Exception as e:
+                results.put({'type': 'result', 'worker': worker_id, 'address': address,
+                             'count': 0, 'partial': False, 'error': str(e),
+                             'seconds': round(time.time() - started, 2)})
+
+            handled += 1
+            rss = process_tree_rss_mb()
+            if handled >= recycle_after or (max_rss_mb and rss is not None and rss > max_rss_mb):
+                reason = f"{handled} địa chỉ" if handled >= recycle_after else f"RSS {rss:.0f} MB"
+                print(f"♻️  Worker {worker_id}: khởi động lại browser ({reason})")
+                await _close_quietly(crawler, worker_id)
+                crawler = new_crawler()
+                await crawler.start()
+                handled = 0
+    finally:
+        await _close_quietly(crawler, worker_id)
+
+
+def _worker_main(worker_id: int, tasks, results, max_images: int, output_dir: str,
+                 headless: bool, recycle_after: int, max_rss_mb: Optional[float],
+                 transcode: Optional[str], http_first: bool, budget_ms: Optional[float]):
+    # clean = đã nhận sentinel None; worker lỗi giữa chừng để lại sentinel cho worker thay thế
+    clean = False
+    try:
+        clean = asyncio.run(_worker_loop(worker_id, tasks, results, max_images, output_dir,
+                                         headless, recycle_after, max_rss_mb, transcode,
+                                         http_first, budget_ms))
+    finally:
+        results.put({'type': 'done', 'worker': worker_id, 'clean': clean})
+
+
+def crawl_many(addresses: Iterable[str], max_images: int = 20, output_dir: str = 'images',
+               workers: Optional[int] = None, headless: bool = True,
+               recycle_after: int = DEFAULT_RECYCLE_AFTER,
+               max_rss_mb: Optional[float] = DEFAULT_MAX_RSS_MB,
+               transcode: Optional[str] = None, http_first: bool = True,
+               budget_ms: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Crawl nhiều địa chỉ song song, mỗi worker process có một browser riêng.
+
+    Kết quả được trả về ngay khi từng địa chỉ xong (không theo thứ tự) dạng
+    {'address', 'count', 'partial', 'error', 'worker', 'seconds'}; budget_ms giới hạn
+    thời gian cho từng địa chỉ (partial=True khi hết giờ giữa chừng). Worker chết giữa chừng
+    (ví dụ bị OOM kill) được thay bằng worker mới, địa chỉ đang chạy trả về lỗi.
+    """
+    addresses = list(addresses)
+    if not addresses:
+        return
+    if transcode:
+        # Kiểm tra ở process cha, tránh mọi worker cùng lỗi khi khởi động
+        check_transcode(transcode)
+    workers = max(1, min(workers or max(1, (os.cpu_count() or 2) // 2), len(addresses)))
+
+    # spawn: Playwright/Chromium không an toàn khi fork
+    ctx = mp.get_context('spawn')
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    for address in addresses:
+        tasks.put(address)
+    for _ in range(workers):
+        tasks.put(None)
+
+    def spawn(worker_id):
+        proc = ctx.Process(
+            target=_worker_main,
+            args=(worker_id, tasks, results, max_images, output_dir, headless, recycle_after, max_rss_mb,
+                  transcode, http_first, budget_ms),
+            daemon=True
+        )
+        proc.start()
+        return proc
+
+    procs = {i: spawn(i) for i in range(workers)}
+    next_id = workers
+    respawns_left = workers  # giới hạn để không spawn mãi khi browser không khởi động được
+    in_flight: Dict[int, str] = {}
+    pending = Counter(addresses)
+
+    def failed(worker_id, address, error):
+        pending[address] -= 1
+        return {'address': address, 'count': 0, 'partial': False, 'error': error, 'worker': worker_id,
+                'seconds': None}
+
+    def replace(worker_id, error):
+        nonlocal next_id, respawns_left
+        address = in_flight.pop(worker_id, None)
+        if respawns_left > 0:
+            # Worker chết có thể đã lấy sentinel của mình: thêm một sentinel để worker mới
+            # không chờ mãi (thừa cũng không sao, nó nằm sau mọi địa chỉ)
+            tasks.put(None)
+            procs[next_id] = spawn(next_id)
+            next_id += 1
+            respawns_left -= 1
+        return failed(worker_id, address, error) if address is not None else None
+
+    try:
+        while procs:
+            try:
+                message = results.get(timeout=1)
+            except queue.Empty:
+                message = None
+
+            if message is not None:
+                worker_id = message['worker']
+                if message['type'] == 'started':
+                    in_flight[worker_id] = message['address']
+                elif message['type'] == 'result':
+                    # Địa chỉ đã được báo lỗi khi thay worker chết (kết quả đến muộn)
+                    if in_flight.pop(worker_id, None) is None:
+                        continue
+                    pending[message['address']] -= 1
+                    yield {k: v for k, v in message.items() if k != 'type'}
+                elif message['type'] == 'done':
+                    # Worker có thể đã bị vòng kiểm tra is_alive() bên dưới xử lý (và thay thế) rồi
+                    proc = procs.pop(worker_id, None)
+                    if proc is None:
+                        continue
+                    proc.join()
+                    if not message['clean']:
+                        result = replace(worker_id, 'worker crashed')
+                        if result:
+                            yield result
+                continue
+
+            # Worker chết không kịp gửi 'done' (ví dụ bị OOM kill)
+            for worker_id, proc in list(procs.items()):
+                if not proc.is_alive() and proc.exitcode != 0:
+                    del procs[worker_id]
+                    result = replace(worker_id, f"worker exited with code {proc.exitcode}")
+                    if result:
+                        yield result
+    finally:
+        for proc in procs.values():
+            proc.terminate()
+
+    for address, left in pending.items():
+        for _ in range(left):
+            yield {'address': address, 'count': 0, 'partial': False, 'error': 'not crawled', 'worker': None,
+                   'seconds': None}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Crawl ảnh Google Maps cho nhiều địa chỉ bằng nhiều process')
+    parser.add_argument('addresses_file', help='File text, mỗi dòng một địa chỉ')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='Số worker process (mặc định: số core / 2)')
+    parser.add_argument('--max-images', '-m', type=int, default=20)
+    parser.add_argument('--output', '-o', default='images')
+    parser.add_argument('--recycle-after', type=int, default=DEFAULT_RECYCLE_AFTER,
+                        help='Khởi động lại browser sau N địa chỉ')
+    parser.add_argument('--max-rss-mb', type=float, default=DEFAULT_MAX_RSS_MB,
+                        help='Khởi động lại browser khi RSS vượt ngưỡng (cần psutil)')
+    parser.add_argument('--transcode', choices=['webp', 'jpeg'], default=None,
+                        help='Nén lại ảnh sau khi tải (cần Pillow)')
+    parser.add_argument('--browser-only', action='store_true',
+                        help='Luôn dùng Playwright, bỏ qua bước lấy ảnh qua HTTP')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='Thời gian tối đa cho mỗi địa chỉ (ms), hết giờ thì trả về ảnh đã tải được')
+    parser.add_argument('--show-browser', action='store_true')
+    args = parser.parse_args()
+
+    with open(args.addresses_file, encoding='utf-8') as f:
+        address_list = [line.strip() for line in f if line.strip()]
+
+    if args.transcode:
+        try:
+            check_transcode(args.transcode)
+        except RuntimeError as e:
+            parser.error(str(e))
+
+    if psutil is None:
+        print("ℹ️  Chưa cài psutil, chỉ khởi động lại browser theo số địa chỉ")
+
+    start = time.time()
+    total_images = 0
+    for done, result in enumerate(crawl_many(address_list, args.max_images, args.output, args.workers,
+                                             not args.show_browser, args.recycle_after, args.max_rss_mb,
+                                             args.transcode, not args.browser_only, args.budget_ms), 1):
+        total_images += result['count']
+        status = f"❌ {result['error']}" if result['error'] else f"✅ {result['count']} ảnh"
+        if result['partial']:
+            status += " (hết thời gian)"
+        print(f"[{done}/{len(address_list)}] {result['address']}: {status}", file=sys.stderr)
+
+    print(f"\n🎉 Đã tải {total_images} ảnh cho {len(address_list)} địa chỉ")
+    print(f"⏱️  Thời gian: {time.time() - start:.2f} giây")
@@ -0,0 +1,70 @@
+import re
+import requests
+from typing import List, Optional
+from urllib.parse import quote
+
+from photo_url import dedupe_photo_urls
+
+SEARCH_URL = 'https://www.google.com/maps/search/{query}?hl=vi'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# URL trong payload bị escape 1-2 lần (chuỗi JSON nằm trong chuỗi JS): \u003d, \\u003d, \/ ...
+_ESCAPES = [
+    (re.compile(r'\\+u003d', re.IGNORECASE), '='),
+    (re.compile(r'\\+u0026', re.IGNORECASE), '&'),
+    (re.compile(r'\\+/'), '/'),
+    (re.compile(r'&amp;'), '&'),
+]
+
+# URL ảnh địa điểm / Street View (có thể không có scheme: //geo0.ggpht.com/cbk?...)
+_PHOTO_URL = re.compile(
+    r'(?:https?:)?//(?:lh\d\.(?:googleusercontent|ggpht)\.com|streetviewpixels-pa\.googleapis\.com|geo\d*\.ggpht\.com)'
+    r'/[^\s"\'\\<>()\[\],]+',
+    re.IGNORECASE
+)
+
+_INIT_STATE = re.compile(r'window\.APP_INITIALIZATION_STATE\s*=(.*?);window\.APP_(?:FLAGS|OPTIONS)', re.DOTALL)
+_OG_IMAGE = re.compile(r'<meta[^>]+(?:property|itemprop)="(?:og:)?image"[^>]+content="([^"]+)"', re.IGNORECASE)
+
+
+def unescape_payload(text: str) -> str:
+    for pattern, replacement in _ESCAPES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def extract_photo_urls(html: str, max_images: int = 20) -> List[str]:
+    """
+    Lấy URL ảnh và Street View từ dữ liệu khởi tạo (APP_INITIALIZATION_STATE) và
+    thẻ og:image của trang Google Maps, đã loại trùng và đổi sang kích thước lớn.
+    """
+    # Không thấy dữ liệu khởi tạo (cấu trúc trang thay đổi) thì quét cả trang
+    payload = ' '.join((_INIT_STATE.findall(html) or [html]) + _OG_IMAGE.findall(html))
+    urls = []
+    for match in _PHOTO_URL.finditer(unescape_payload(payload)):
+        url = match.group(0)
+        urls.append('https:' + url if url.startswith('//') else url)
+    return [ref.url for ref in dedupe_photo_urls(urls)][:max_images]
+
+
+def fetch_place_page(address: str, timeout: float = 10, session: Optional[requests.Session] = None) -> str:
+    """Tải trang tìm kiếm Google Maps của địa chỉ bằng HTTP thường (không cần browser)."""
+    http = session or requests
+    response = http.get(
+        SEARCH_URL.format(query=quote(address)),
+        headers={'User-Agent': USER_AGENT, 'Accept-Language': 'vi,en;q=0.8'},
+        # Bỏ qua trang xác nhận cookie
+        cookies={'CONSENT': 'YES+'},
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return response.text
+
+
+def fetch_photo_urls(address: str, max_images: int = 20, timeout: float = 10) -> List[str]:
+    """URL ảnh của địa chỉ qua HTTP, [] nếu lỗi hoặc trang không có dữ liệu ảnh."""
+    try:
+        return extract_photo_urls(fetch_place_page(address, timeout), max_images)
+    except Exception as e:
+        print(f"⚠️ Không lấy được ảnh qua HTTP: {str(e)}")
+        return []
@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow là tùy chọn, thiếu thì chỉ sửa đuôi file theo định dạng thật
+    Image = None
+
+# Định dạng đầu ra được hỗ trợ -> (tên định dạng của Pillow, đuôi file)
+OUTPUT_FORMATS = {
+    'webp': ('WEBP', '.webp'),
+    'jpeg': ('JPEG', '.jpg'),
+}
+
+EXTENSIONS = {
+    'jpeg': '.jpg', 'png': '.png', 'gif': '.gif', 'webp': '.webp',
+    'avif': '.avif', 'heic': '.heic', 'bmp': '.bmp',
+}
+
+DEFAULT_QUALITY = 80
+DEFAULT_MAX_DIMENSION = 2048
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def detect_image_format(data: bytes) -> Optional[str]:
+    """Định dạng thật của ảnh theo magic bytes ('jpeg', 'png', 'webp'...), None nếu không nhận ra."""
+    if data[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    if data[4:8] == b'ftyp':
+        brand = data[8:12]
+        if brand in (b'avif', b'avis'):
+            return 'avif'
+        if brand in (b'heic', b'heix', b'mif1', b'msf1'):
+            return 'heic'
+    if data[:2] == b'BM':
+        return 'bmp'
+    return None
+
+
+def check_transcode(output_format: str):
+    """Báo lỗi sớm (trước khi tải ảnh) nếu không transcode được sang output_format."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Định dạng nén không hỗ trợ: {output_format} (chọn {', '.join(OUTPUT_FORMATS)})")
+    if Image is None:
+        raise RuntimeError("Nén ảnh cần Pillow: pip install Pillow")
+
+
+def transcode_image(path: str, output_format: str = 'webp', quality: int = DEFAULT_QUALITY,
+                    max_dimension: int = DEFAULT_MAX_DIMENSION) -> Dict:
+    """
+    Nén lại một ảnh đã tải sang WebP/JPEG, thu nhỏ cạnh dài về max_dimension.
+
+    File gốc được thay bằng file mới (đổi đuôi theo định dạng). Nếu bản nén lại
+    không nhỏ hơn, ảnh động, hoặc không có Pillow, giữ nguyên nội dung và chỉ
+    sửa đuôi file cho đúng định dạng thật.
+
+    Returns:
+        dict: Metadata cho file sidecar
+    """
+    src = Path(path)
+    data = src.read_bytes()
+    detected = detect_image_format(data)
+    meta = {
+        'original_format': detected,
+        'original_bytes': len(data),
+        'width': None,
+        'height': None,
+    }
+
+    encoded = None
+    target_format, target_ext = OUTPUT_FORMATS[output_format]
+    if Image is not None and detected is not None:
+        try:
+            with Image.open(src) as img:
+                meta['width'], meta['height'] = img.size
+                if not getattr(img, 'is_animated', False):
+                    img = ImageOps.exif_transpose(img)
+                    img.thumbnail((max_dimension, max_dimension))
+                    if target_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+                        img = img.convert('RGB')
+                    elif img.mode not in ('RGB', 'RGBA', 'L'):
+                        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+                    tmp = src.with_suffix(target_ext + '.tmp')
+                    save_args = {'quality': quality}
+                    if target_format == 'JPEG':
+                        save_args.update(optimize=True, progressive=True)
+                    else:
+                        save_args.update(method=4)
+                    img.save(tmp, target_format, **save_args)
+                    encoded = (tmp, img.size)
+        except Exception as e:
+            meta['error'] = str(e)
+
+    if encoded is not None and encoded[0].stat().st_size < len(data):
+        tmp, (width, height) = encoded
+        dest = src.with_suffix(target_ext)
+        os.replace(tmp, dest)
+        if dest != src:
+            src.unlink()
+        meta.update(output_format=output_format, output_width=width, output_height=height, transcoded=True)
+    else:
+        if encoded is not None:
+            encoded[0].unlink()
+        dest = src.with_suffix(EXTENSIONS.get(detected, src.suffix))
+        if dest != src:
+            os.replace(src, dest)
+        meta.update(output_format=detected, output_width=meta['width'], output_height=meta['height'],
+                    transcoded=False)
+
+    output = dest.read_bytes()
+    meta.update(file=dest.name, bytes=len(output), sha256=hashlib.sha256(output).hexdigest())
+    return meta
+
+
+def get_executor(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool dùng chung cho mọi lần transcode (tạo một lần, dùng lại giữa các địa chỉ)."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+
+def submit_transcode(path: str, output_format: str = 'webp', quality: int = DEFAULT_QUALITY,
+                     max_dimension: int = DEFAULT_MAX_DIMENSION, workers: Optional[int] = None) -> Future:
+    """Đưa một ảnh vào process pool (workers: kích thước pool khi tạo lần đầu), trả về Future của metadata."""
+    return get_executor(workers).submit(transcode_image, path, output_format, quality, max_dimension)
+
+
+def write_sidecar(dir_path: Path, safe_name: str, address: str, images: List[Dict]) -> Path:
+    """Ghi metadata các ảnh của một địa chỉ vào <safe_name>.json."""
+    sidecar = Path(dir_path) / f"{safe_name}.json"
+    with open(sidecar, 'w', encoding='utf-8') as f:
+        json.dump({'address': address, 'images': images}, f, ensure_ascii=False, indent=2)
+    return sidecar
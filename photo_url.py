@@ -0,0 +1,115 @@
+import math
+import re
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+# Kích thước muốn tải
+PHOTO_SIZE = (2048, 2048)
+STREETVIEW_SIZE = (1200, 600)
+
+PHOTO_HOST = 'https://lh3.googleusercontent.com'
+STREETVIEW_ENDPOINT = 'https://streetviewpixels-pa.googleapis.com/v1/thumbnail'
+
+
+class PhotoRef(NamedTuple):
+    kind: str       # 'photo', 'streetview', 'avatar'
+    key: str        # ID ổn định để loại trùng (không phụ thuộc host hay kích thước)
+    url: str        # URL tải ở kích thước mong muốn
+
+
+# Tham số góc nhìn (ảnh 360: pi=pitch, ya=yaw, ro=roll, fo=fov) làm thay đổi nội dung ảnh.
+# Giá trị có thể bắt đầu bằng '-' ("pi-0", "ro-0") nên không tách tham số theo '-' được
+_VIEW_OPTION = re.compile(r'(?:^|-)((?:pi|ya|ro|fo)-?\d+(?:\.\d+)?)(?=-|$)')
+
+
+def _photo(match, width: int, height: int) -> PhotoRef:
+    photo_id = match.group('id')
+    view = _VIEW_OPTION.findall(match.group('params') or '')
+    params = '-'.join([f'w{width}', f'h{height}', 'k', 'no'] + view)
+    key = 'photo:' + photo_id + (':' + '-'.join(view) if view else '')
+    return PhotoRef('photo', key, f"{PHOTO_HOST}/{photo_id}={params}")
+
+
+def _legacy_photo(match, width: int, height: int) -> PhotoRef:
+    photo_id = match.group('id')
+    return PhotoRef('photo', 'photo:' + photo_id,
+                    f"{PHOTO_HOST}/{photo_id}/s{max(width, height)}/{match.group('name')}")
+
+
+def _avatar(match, width: int, height: int) -> PhotoRef:
+    return PhotoRef('avatar', 'avatar:' + match.group('id'), match.group(0))
+
+
+def _round_half_up(value: float) -> int:
+    # round() làm tròn .5 về số chẵn (184.5 -> 184 nhưng 184.53 -> 185), hai góc gần như
+    # trùng nhau thành hai key khác nhau
+    return int(math.floor(value + 0.5))
+
+
+def _streetview(match, width: int, height: int) -> Optional[PhotoRef]:
+    query = {k: v[0] for k, v in parse_qs(urlsplit(match.group(0)).query).items()}
+    panoid = query.get('panoid')
+    if not panoid:
+        return None
+
+    yaw = _round_half_up(float(query.get('yaw', 0) or 0)) % 360
+    pitch = _round_half_up(float(query.get('pitch', 0) or 0))
+    fov = _round_half_up(float(query.get('thumbfov', 100) or 100))
+    url = STREETVIEW_ENDPOINT + '?' + urlencode({
+        'panoid': panoid,
+        'cb_client': query.get('cb_client', 'maps_sv.tactile.gps'),
+        'w': width,
+        'h': height,
+        'yaw': yaw,
+        'pitch': pitch,
+        'thumbfov': fov,
+    })
+    return PhotoRef('streetview', f'streetview:{panoid}:{yaw}:{pitch}', url)
+
+
+# Bảng quy tắc theo CDN, thử theo thứ tự: (regex, hàm tạo PhotoRef, loại kích thước)
+_RULES: List[Tuple[Pattern, Callable, str]] = [
+    # Street View: streetviewpixels-pa.googleapis.com/v1/thumbnail?panoid=...,
+    # geo0.ggpht.com/cbk?panoid=...
+    (re.compile(r'^https?://(?:streetviewpixels-pa\.googleapis\.com/v1/thumbnail|geo\d*\.ggpht\.com/cbk)\?\S*',
+                re.IGNORECASE),
+     _streetview, 'streetview'),
+    # Ảnh đại diện người dùng: lh3.googleusercontent.com/a/..., /a-/...
+    (re.compile(r'^https?://lh\d\.(?:googleusercontent|ggpht)\.com/(?P<id>a-?/[^=?#\s]+)\S*', re.IGNORECASE),
+     _avatar, 'photo'),
+    # Ảnh kiểu cũ (Picasa): /-XXXX/YYYY/AAAA/ZZZZ/s1600-w400/photo.jpg
+    (re.compile(r'^https?://lh\d\.(?:googleusercontent|ggpht)\.com/'
+                r'(?P<id>-[^/]+/[^/]+/[^/]+/[^/]+)/(?:[^/]+/)?(?P<name>[^/?#=\s]+)$', re.IGNORECASE),
+     _legacy_photo, 'photo'),
+    # Ảnh địa điểm: lh3/lh5.googleusercontent.com/p/AF1Qip...=w408-h306-k-no,
+    # /gps-cs-s/..., lh3.ggpht.com/p/...
+    (re.compile(r'^https?://lh\d\.(?:googleusercontent|ggpht)\.com/(?P<id>[^=?#\s]+)(?:=(?P<params>[^?#\s]*))?',
+                re.IGNORECASE),
+     _photo, 'photo'),
+]
+
+
+def canonicalize_photo_url(url: str, photo_size: Tuple[int, int] = PHOTO_SIZE,
+                           streetview_size: Tuple[int, int] = STREETVIEW_SIZE) -> Optional[PhotoRef]:
+    """ID ổn định và URL kích thước mong muốn của một URL ảnh Google, None nếu không phải ảnh Google."""
+    url = url.strip()
+    for pattern, build, size_kind in _RULES:
+        match = pattern.match(url)
+        if match:
+            size = streetview_size if size_kind == 'streetview' else photo_size
+            try:
+                return build(match, *size)
+            except ValueError:
+                return None
+    return None
+
+
+def dedupe_photo_urls(urls: Iterable[str], include_avatars: bool = False) -> List[PhotoRef]:
+    """Loại ảnh trùng (cùng ID qua host/kích thước khác nhau), giữ thứ tự xuất hiện."""
+    seen: Dict[str, PhotoRef] = {}
+    for url in urls:
+        ref = canonicalize_photo_url(url)
+        if ref is None or (ref.kind == 'avatar' and not include_avatars):
+            continue
+        seen.setdefault(ref.key, ref)
+    return list(seen.values())
@@ -4,9 +4,68 @@ import requests
 import time
 import asyncio
 from pathlib import Path
-from typing import List, Optional
-from playwright.async_api import async_playwright, Page, Browser
+from concurrent.futures import wait as wait_futures
+from typing import TYPE_CHECKING, Awaitable, List, Optional, Tuple
+from image_transcode import DEFAULT_MAX_DIMENSION, DEFAULT_QUALITY, check_transcode, submit_transcode, write_sidecar
+from photo_url import canonicalize_photo_url
+from http_photo_extractor import fetch_photo_urls
 
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Page
+
+# Khi có budget_ms: tỉ lệ thời gian còn lại dành cho bước tìm kiếm, rồi cho bước trích xuất
+# (bước xong sớm thì phần dư dồn cho bước sau, download dùng toàn bộ phần còn lại)
+SEARCH_SHARE = 0.4
+EXTRACT_SHARE = 0.5
+HTTP_TIMEOUT = 10
+
+
+class Deadline:
+    """Hạn chót cho một lần crawl, tính theo time.monotonic()."""
+
+    def __init__(self, budget_ms: float):
+        self.end = time.monotonic() + budget_ms / 1000
+
+    def remaining(self) -> float:
+        """Số giây còn lại (0 nếu đã hết)."""
+        return max(0.0, self.end - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def sub(self, share: float) -> 'Deadline':
+        """Hạn chót cho một bước: `share` phần thời gian còn lại."""
+        return Deadline(self.remaining() * share * 1000)
+
+
+class CrawlResult(int):
+    """Số ảnh đã tải (dùng như int); partial=True nếu dừng sớm vì hết thời gian."""
+
+    def __new__(cls, count: int = 0, partial: bool = False):
+        result = super().__new__(cls, count)
+        result.partial = partial
+        return result
+
+
+async def run_until(coro: Awaitable, deadline: Optional[Deadline]) -> Tuple[bool, object]:
+    """Chạy coroutine tới hạn chót, quá hạn thì hủy. Returns: (xong trong hạn, kết quả)"""
+    if deadline is None:
+        return True, await coro
+    try:
+        return True, await asyncio.wait_for(coro, deadline.remaining())
+    except asyncio.TimeoutError:
+        return False, None
+
+
+def timeout_ms(ms: float, deadline: Optional[Deadline]) -> float:
+    """Timeout (ms) cho một lệnh Playwright, không vượt quá thời gian còn lại (0 = không giới hạn nên tối thiểu 1)."""
+    return max(1.0, min(ms, deadline.remaining() * 1000)) if deadline else ms
+
+
+def settle_ms(ms: float, deadline: Optional[Deadline]) -> float:
+    """Thời gian chờ trang ổn định (ms): có hạn chót thì chờ tối đa nửa thời gian còn lại để bước sau còn giờ chạy."""
+    return min(ms, deadline.remaining() * 500) if deadline else ms
 def sanitize_filename(address: str, max_length: int = 100) -> str:
     safe_name = re.sub(r'[^\w\s-]', '', address)
     safe_name = re.sub(r'\s+', '_', safe_name)
@@ -19,10 +78,14 @@ def ensure_dir(path: str) -> Path:
     dir_path.mkdir(parents=True, exist_ok=True)
     return dir_path
 
-def download_image_with_retry(url: str, filepath: str, max_retries: int = 3, timeout: int = 10) -> bool:
+def download_image_with_retry(url: str, filepath: str, max_retries: int = 3, timeout: int = 10,
+                              deadline: Optional[Deadline] = None) -> bool:
     for attempt in range(max_retries):
+        if deadline and deadline.expired:
+            return False
         try:
-            response = requests.get(url, timeout=timeout, stream=True)
+            response = requests.get(url, timeout=min(timeout, deadline.remaining()) if deadline else timeout,
+                                    stream=True)
             response.raise_for_status()
             with open(filepath, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
@@ -33,7 +96,7 @@ def download_image_with_retry(url: str, filepath: str, max_retries: int = 3, tim
             else:
                 os.remove(filepath)
         except Exception as e:
-            if attempt < max_retries - 1:
+            if attempt < max_retries - 1 and not (deadline and deadline.remaining() < attempt + 1):
                 time.sleep(1 * (attempt + 1))
                 continue
             else:
@@ -49,10 +112,26 @@ def get_image_extension(url: str) -> str:
 
 
 class GoogleMapsCrawler:
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, transcode: Optional[str] = None,
+                 quality: int = DEFAULT_QUALITY, max_dimension: int = DEFAULT_MAX_DIMENSION,
+                 transcode_workers: Optional[int] = None, http_first: bool = True):
+        """
+        http_first: Thử lấy ảnh qua HTTP trước, chỉ mở browser khi không lấy được ảnh nào
+        transcode: 'webp' / 'jpeg' để nén lại ảnh sau khi tải (process pool), None = giữ nguyên
+        quality, max_dimension: Chất lượng nén và cạnh dài tối đa (px) khi transcode
+        transcode_workers: Số process nén ảnh (mặc định: số core)
+        """
+        if transcode:
+            check_transcode(transcode)
         self.headless = headless
-        self.browser: Optional[Browser] = None
-        self.page: Optional[Page] = None
+        self.transcode = transcode
+        self.quality = quality
+        self.max_dimension = max_dimension
+        self.transcode_workers = transcode_workers
+        self.http_first = http_first
+        self.playwright = None
+        self.browser: Optional['Browser'] = None
+        self.page: Optional['Page'] = None
         
     async def __aenter__(self):
         await self.start()
@@ -62,48 +141,73 @@ class GoogleMapsCrawler:
         await self.close()
         
     async def start(self):
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=self.headless,
-            args=['--disable-blink-features=AutomationControlled']
-        )
-        context = await self.browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            viewport={'width': 1920, 'height': 1080}
-        )
-        self.page = await context.new_page()
-        self.page.set_default_timeout(60000)
+        # Chế độ HTTP trước: browser chỉ được mở khi cần (xem crawl)
+        if not self.http_first:
+            await self.launch_browser()
+        
+    async def launch_browser(self):
+        if self.browser: return
+        # Chỉ cần Playwright khi thật sự mở browser (chế độ HTTP trước có thể chạy không có nó)
+        from playwright.async_api import async_playwright
+        try:
+            self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(
+                headless=self.headless,
+                args=['--disable-blink-features=AutomationControlled']
+            )
+            context = await self.browser.new_context(
+                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                viewport={'width': 1920, 'height': 1080}
+            )
+            self.page = await context.new_page()
+            self.page.set_default_timeout(60000)
+        except BaseException:
+            # Lỗi hoặc bị hủy (hết giờ) giữa chừng: dừng driver đã khởi động (kéo theo browser)
+            # để lần sau mở lại từ đầu thay vì để lại một driver không ai đóng
+            playwright = self.playwright
+            self.playwright, self.browser, self.page = None, None, None
+            if playwright:
+                try:
+                    await playwright.stop()
+                except Exception:
+                    pass
+            raise
         
     async def close(self):
         if self.page: await self.page.close()
         if self.browser: await self.browser.close()
         if self.playwright: await self.playwright.stop()
+        self.playwright, self.browser, self.page = None, None, None
             
-    async def search_address(self, address: str) -> bool:
+    async def search_address(self, address: str, deadline: Optional[Deadline] = None) -> bool:
         try:
             print(f"🔍 Đang tìm kiếm: {address}")
-            await self.page.goto('https://www.google.com/maps', wait_until='domcontentloaded')
-            await self.page.wait_for_timeout(3000)
-            search_box = await self.page.wait_for_selector('input#searchboxinput')
+            await self.page.goto('https://www.google.com/maps', wait_until='domcontentloaded',
+                                 timeout=timeout_ms(60000, deadline))
+            await self.page.wait_for_timeout(settle_ms(3000, deadline))
+            search_box = await self.page.wait_for_selector('input#searchboxinput', timeout=timeout_ms(60000, deadline))
             await search_box.fill(address)
             await search_box.press('Enter')
-            await self.page.wait_for_timeout(5000)
+            await self.page.wait_for_timeout(settle_ms(5000, deadline))
             try:
-                await self.page.wait_for_selector('[role="main"]', timeout=10000)
+                await self.page.wait_for_selector('[role="main"]', timeout=timeout_ms(10000, deadline))
                 print("✅ Tìm thấy địa điểm")
                 return True
-            except:
+            except Exception:
                 print("❌ Không tìm thấy địa điểm")
                 return False
         except Exception as e:
             print(f"❌ Lỗi khi tìm kiếm: {str(e)}")
             return False
             
-    async def extract_image_urls(self, max_images: int = 20) -> List[str]:
-        image_urls = []
+    async def extract_image_urls(self, max_images: int = 20, image_urls: Optional[List[str]] = None,
+                                 deadline: Optional[Deadline] = None) -> List[str]:
+        # image_urls: danh sách để ghi kết quả vào, vẫn giữ được ảnh đã tìm nếu bị hủy giữa chừng
+        image_urls = [] if image_urls is None else image_urls
+        seen_keys = set()
         try:
             print("📸 Đang tìm ảnh...")
-            await self.page.wait_for_timeout(3000)
+            await self.page.wait_for_timeout(settle_ms(3000, deadline))
             
             # Chiến lược 1: Tìm và click vào ảnh thumbnail để mở gallery
             print("🔍 Tìm ảnh thumbnail trên trang...")
@@ -137,15 +241,15 @@ class GoogleMapsCrawler:
                             # Click vào thumbnail
                             print(f"  🖱️  Click vào ảnh để mở gallery...")
                             await thumb.click()
-                            await self.page.wait_for_timeout(2000)
+                            await self.page.wait_for_timeout(settle_ms(2000, deadline))
                             photo_found = True
                             break
-                        except:
+                        except Exception:
                             continue
                     
                     if photo_found:
                         break
-                except:
+                except Exception:
                     continue
             
             if not photo_found:
@@ -161,14 +265,14 @@ class GoogleMapsCrawler:
                 
                 for selector in photo_button_selectors:
                     try:
-                        photo_button = await self.page.wait_for_selector(selector, timeout=3000)
+                        photo_button = await self.page.wait_for_selector(selector, timeout=timeout_ms(3000, deadline))
                         if photo_button:
                             print(f"✅ Tìm thấy nút Photos, đang click...")
                             await photo_button.click()
-                            await self.page.wait_for_timeout(3000)
+                            await self.page.wait_for_timeout(settle_ms(3000, deadline))
                             photo_found = True
                             break
-                    except:
+                    except Exception:
                         continue
             
             if not photo_found:
@@ -199,36 +303,25 @@ class GoogleMapsCrawler:
                         if any(skip in src.lower() for skip in skip_keywords):
                             continue
                         
-                        # Lấy ảnh từ Google CDN (bao gồm cả Street View và ảnh người dùng)
-                        # Chấp nhận: googleusercontent.com, ggpht.com, streetviewpixels (Street View)
-                        if not any(cdn in src for cdn in ['googleusercontent.com', 'ggpht.com', 'streetviewpixels', 'googleapis.com/v1/thumbnail']):
-                            continue
-                        
                         # Bỏ qua ảnh quá nhỏ (icon)
                         if '=s0' in src or '=w48' in src or '=h48' in src:
                             continue
                         
-                        # Tạo URL chất lượng cao
-                        if '=' in src:
-                            base_url = src.split('=')[0]
-                            # Đối với Street View, giữ nguyên parameters hoặc tăng kích thước
-                            if 'streetviewpixels' in src or 'thumbnail' in src:
-                                high_quality_url = src.replace('w203-h100', 'w1200-h600').replace('w408-h200', 'w1200-h600')
-                            else:
-                                high_quality_url = f"{base_url}=w2048-h2048"
-                        else:
-                            high_quality_url = src
+                        # Chuẩn hóa theo ID ảnh / panorama: cùng một ảnh ở nhiều kích thước
+                        # hoặc host khác nhau (lh3/lh5, ggpht) chỉ lấy một lần, ở kích thước lớn
+                        ref = canonicalize_photo_url(src)
+                        if ref is None or ref.kind == 'avatar' or ref.key in seen_keys:
+                            continue
+                        seen_keys.add(ref.key)
+                        image_urls.append(ref.url)
                         
-                        if high_quality_url not in image_urls:
-                            image_urls.append(high_quality_url)
-                            
-                            # Hiển thị loại ảnh
-                            img_type = "Street View" if 'streetview' in src.lower() or 'thumbnail' in src.lower() else "Photo"
-                            print(f"  ✅ Tìm thấy {img_type} {len(image_urls)}/{max_images}")
-                            
-                            if len(image_urls) >= max_images:
-                                break
-                    except:
+                        # Hiển thị loại ảnh
+                        img_type = "Street View" if ref.kind == 'streetview' else "Photo"
+                        print(f"  ✅ Tìm thấy {img_type} {len(image_urls)}/{max_images}")
+                        
+                        if len(image_urls) >= max_images:
+                            break
+                    except Exception:
                         continue
                 
                 if len(image_urls) >= max_images:
@@ -236,7 +329,7 @@ class GoogleMapsCrawler:
                 
                 # Scroll xuống
                 await self.page.evaluate('window.scrollBy(0, 800)')
-                await self.page.wait_for_timeout(1000)
+                await self.page.wait_for_timeout(settle_ms(1000, deadline))
                 
                 # Scroll trong gallery nếu có
                 try:
@@ -244,7 +337,7 @@ class GoogleMapsCrawler:
                         const gallery = document.querySelector('[role="dialog"], .gallery, [class*="photo"]');
                         if (gallery) gallery.scrollBy(0, 500);
                     ''')
-                except:
+                except Exception:
                     pass
                 
                 # Thử nhấn mũi tên next trong gallery
@@ -253,8 +346,8 @@ class GoogleMapsCrawler:
                         next_button = await self.page.query_selector('button[aria-label*="Next"], button[aria-label*="next"]')
                         if next_button:
                             await next_button.click()
-                            await self.page.wait_for_timeout(1500)
-                    except:
+                            await self.page.wait_for_timeout(settle_ms(1500, deadline))
+                    except Exception:
                         pass
             
             print(f"✅ Tổng cộng tìm thấy {len(image_urls)} ảnh")
@@ -275,39 +368,120 @@ class GoogleMapsCrawler:
             traceback.print_exc()
             return image_urls
             
-    def download_images(self, urls: List[str], output_dir: str, address: str) -> int:
+    def download_images(self, urls: List[str], output_dir: str, address: str,
+                        deadline: Optional[Deadline] = None) -> CrawlResult:
         if not urls:
             print("⚠️ Không có ảnh để tải")
-            return 0
+            return CrawlResult(0)
         
         dir_path = ensure_dir(output_dir)
         safe_name = sanitize_filename(address)
         print(f"\n📥 Đang tải {len(urls)} ảnh...")
         success_count = 0
+        partial = False
+        transcoding = []
         
         for idx, url in enumerate(urls, 1):
+            if deadline and deadline.expired:
+                print(f"⏰ Hết thời gian, bỏ qua {len(urls) - idx + 1} ảnh còn lại")
+                partial = True
+                break
             ext = get_image_extension(url)
             filepath = dir_path / f"{safe_name}_{idx:03d}{ext}"
             print(f"  [{idx}/{len(urls)}] Đang tải...", end=' ')
             
-            if download_image_with_retry(url, str(filepath)):
+            if download_image_with_retry(url, str(filepath), deadline=deadline):
                 success_count += 1
                 print("✅")
+                if self.transcode:
+                    # Nén trong process pool song song với việc tải các ảnh tiếp theo
+                    transcoding.append((url, filepath, submit_transcode(
+                        str(filepath), self.transcode, self.quality, self.max_dimension, self.transcode_workers
+                    )))
             else:
                 print("❌")
         
+        if transcoding:
+            images = []
+            if deadline:
+                _, not_done = wait_futures([future for _, _, future in transcoding], timeout=deadline.remaining())
+                # Hết giờ: hủy các job chưa chạy. Job đang chạy không hủy được (nó sẽ đổi tên
+                # file) nên vẫn chờ xong bên dưới để sidecar khớp với file trên đĩa
+                for future in not_done:
+                    future.cancel()
+            
+            for url, filepath, future in transcoding:
+                if future.cancelled():
+                    partial = True
+                    print(f"⏰ Hết thời gian, bỏ qua nén ảnh {filepath.name}")
+                    size = filepath.stat().st_size
+                    images.append({'file': filepath.name, 'original_bytes': size, 'bytes': size,
+                                   'transcoded': False, 'source_url': url})
+                    continue
+                try:
+                    images.append(dict(future.result(), source_url=url))
+                except Exception as e:
+                    print(f"❌ Lỗi nén ảnh {url}: {str(e)}")
+            write_sidecar(dir_path, safe_name, address, images)
+            before = sum(image['original_bytes'] for image in images)
+            after = sum(image['bytes'] for image in images)
+            transcoded = sum(1 for image in images if image.get('transcoded'))
+            print(f"🗜️  Đã nén {transcoded}/{len(images)} ảnh: {before / 1024:.0f} KB -> {after / 1024:.0f} KB")
+        
         print(f"✅ Hoàn thành! Đã tải {success_count}/{len(urls)} ảnh vào {output_dir}")
-        return success_count
+        return CrawlResult(success_count, partial)
+    
+    async def _browser_search(self, address: str, deadline: Optional[Deadline] = None) -> bool:
+        await self.launch_browser()
+        return await self.search_address(address, deadline)
+        
+    async def crawl(self, address: str, max_images: int = 20, output_dir: str = 'images',
+                    budget_ms: Optional[float] = None, deadline: Optional[Deadline] = None) -> CrawlResult:
+        """
+        budget_ms / deadline: Giới hạn thời gian cho cả lần crawl (tìm kiếm, trích xuất, tải ảnh).
+        Hết giờ thì dừng và trả về số ảnh đã tải được, với .partial = True
+        """
+        if deadline is None and budget_ms:
+            deadline = Deadline(budget_ms)
+        search_deadline = deadline.sub(SEARCH_SHARE) if deadline else None
+        
+        urls: List[str] = []
+        if self.http_first and not (deadline and deadline.expired):
+            timeout = min(HTTP_TIMEOUT, search_deadline.remaining()) if deadline else HTTP_TIMEOUT
+            urls = await asyncio.to_thread(fetch_photo_urls, address, max_images, timeout)
+            if urls:
+                print(f"⚡ Lấy được {len(urls)} ảnh qua HTTP, không cần mở browser")
+            else:
+                print("ℹ️ Không lấy được ảnh qua HTTP, chuyển sang Playwright...")
+        
+        partial = False
+        if not urls:
+            done, found = await run_until(self._browser_search(address, search_deadline), search_deadline)
+            # Lệnh chờ đã bị cắt theo hạn chót: không tìm thấy lúc hết giờ cũng là hết giờ
+            if not done or (not found and search_deadline and search_deadline.expired):
+                print("⏰ Hết thời gian khi tìm kiếm địa chỉ")
+                return CrawlResult(0, partial=True)
+            if not found:
+                return CrawlResult(0)
+            
+            extract_deadline = deadline.sub(EXTRACT_SHARE) if deadline else None
+            done, _ = await run_until(self.extract_image_urls(max_images, urls, extract_deadline), extract_deadline)
+            if not done:
+                print(f"⏰ Hết thời gian khi tìm ảnh, dùng {len(urls)} ảnh đã tìm được")
+                partial = True
         
-    async def crawl(self, address: str, max_images: int = 20, output_dir: str = 'images') -> int:
-        if not await self.search_address(address): return 0
-        urls = await self.extract_image_urls(max_images)
-        return self.download_images(urls, output_dir, address)
+        # Tải ảnh bằng requests (chặn) trong thread riêng để không chặn event loop
+        result = await asyncio.to_thread(self.download_images, urls[:max_images], output_dir, address, deadline)
+        return CrawlResult(result, partial or result.partial)
 
 
-async def crawl_google_maps(address: str, max_images: int = 20, output_dir: str = 'images', headless: bool = True) -> int:
-    async with GoogleMapsCrawler(headless=headless) as crawler:
-        return await crawler.crawl(address, max_images, output_dir)
+async def crawl_google_maps(address: str, max_images: int = 20, output_dir: str = 'images', headless: bool = True,
+                            transcode: Optional[str] = None, http_first: bool = True,
+                            budget_ms: Optional[float] = None) -> CrawlResult:
+    # Tính cả thời gian khởi động browser vào budget
+    deadline = Deadline(budget_ms) if budget_ms else None
+    async with GoogleMapsCrawler(headless=headless, transcode=transcode, http_first=http_first) as crawler:
+        return await crawler.crawl(address, max_images, output_dir, deadline=deadline)
 
 if __name__ == '__main__':
     # Địa chỉ cần crawl
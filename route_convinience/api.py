@@ -1,22 +1,127 @@
-from fastapi import FastAPI, HTTPException, Form
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Form, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from get_3_point import RouteCalculator, calculate_points_G_n_T
+from typing import List, Optional
+from get_3_point import calculate_points_G_n_T
+from calculator_registry import CalculatorRegistry, create_async_client
+from geocode_cache import GeocodeCache
+from prefilter import DEFAULT_DETOUR_FACTOR
+from route_cache import RouteCache
+from response_cache import ResponseCache, canonical_key, make_etag
+from local_routing import LocalRoutingBackend
+from stream_evaluator import iter_ndjson, run_bounded
+from scheduler import BATCH, scheduling_priority
+from heatmap import DEFAULT_REFINE_QUANTILE, build_heatmap, to_geojson, to_grid
+from metrics import REQUEST_DURATION, register_caches, render_latest
+import asyncio
+import time
+import json
 import os
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Get default max_scale from environment variable
+DEFAULT_MAX_SCALE = int(os.getenv('MAX_SCALE', '5'))
+
+# Worker pool size of /evaluate/stream
+DEFAULT_STREAM_CONCURRENCY = int(os.getenv('STREAM_CONCURRENCY', '16'))
+MAX_STREAM_CONCURRENCY = int(os.getenv('MAX_STREAM_CONCURRENCY', '64'))
+
+# Largest lattice (points per side) accepted by /heatmap
+MAX_HEATMAP_RESOLUTION = int(os.getenv('MAX_HEATMAP_RESOLUTION', '100'))
+
+# Upper bound on rows kept per table in the shared SQLite file (0 = unlimited)
+SHARED_CACHE_MAX_ROWS = int(os.getenv('SHARED_CACHE_MAX_ROWS', '0')) or None
+
+# Geocode cache shared by all requests and, through the SQLite file, by all workers
+geocode_cache = GeocodeCache(
+    path=os.getenv('GEOCODE_CACHE_PATH', 'geocode_cache.sqlite3'),
+    ttl=int(os.getenv('GEOCODE_CACHE_TTL', str(30 * 24 * 3600))),
+    shared_max_rows=SHARED_CACHE_MAX_ROWS
+)
+
+# Optional offline road graph used instead of the DistanceMatrix API
+ROUTING_GRAPH_PATH = os.getenv('ROUTING_GRAPH_PATH')
+
+# Route cache shared by all requests, keyed by snapped coordinates; persisted to
+# the same SQLite file as the geocode cache unless ROUTE_CACHE_PATH says otherwise.
+# Routes from the offline graph get their own namespace so they never answer
+# for (or get answered by) Goong results stored in the shared file
+route_cache = RouteCache(
+    precision=int(os.getenv('ROUTE_CACHE_PRECISION', '4')),
+    geohash_precision=int(os.getenv('ROUTE_CACHE_GEOHASH', '0')) or None,
+    ttl=int(os.getenv('ROUTE_CACHE_TTL', str(24 * 3600))),
+    max_size=int(os.getenv('ROUTE_CACHE_SIZE', '10000')),
+    symmetric_vehicles=[v for v in os.getenv('ROUTE_CACHE_SYMMETRIC', '').split(',') if v],
+    path=os.getenv('ROUTE_CACHE_PATH', os.getenv('GEOCODE_CACHE_PATH', 'geocode_cache.sqlite3')) or None,
+    shared_max_rows=SHARED_CACHE_MAX_ROWS,
+    namespace=f'local:{os.path.basename(ROUTING_GRAPH_PATH)}' if ROUTING_GRAPH_PATH else None
+)
+
+# Response cache for /evaluate with single-flight coalescing of identical requests
+response_cache = ResponseCache(
+    ttl=int(os.getenv('RESPONSE_CACHE_TTL', '300')),
+    max_size=int(os.getenv('RESPONSE_CACHE_SIZE', '2048'))
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the pooled HTTP client and calculator registry once per process"""
+    client = create_async_client(
+        max_connections=int(os.getenv('GOONG_MAX_CONNECTIONS', '100')),
+        max_keepalive_connections=int(os.getenv('GOONG_MAX_KEEPALIVE', '20')),
+        keepalive_expiry=float(os.getenv('GOONG_KEEPALIVE_EXPIRY', '30')),
+        timeout=float(os.getenv('GOONG_TIMEOUT', '10')),
+        connect_timeout=float(os.getenv('GOONG_CONNECT_TIMEOUT', '3'))
+    )
+    routing_backend = LocalRoutingBackend.from_file(ROUTING_GRAPH_PATH) if ROUTING_GRAPH_PATH else None
+    
+    app.state.calculators = CalculatorRegistry(
+        client,
+        geocode_cache=geocode_cache,
+        route_cache=route_cache,
+        routing_backend=routing_backend,
+        # Per-key Goong quota; batch endpoints yield to interactive /evaluate
+        rate_limit=float(os.getenv('GOONG_RATE_LIMIT', '0')) or None,
+        rate_burst=int(os.getenv('GOONG_RATE_BURST', '0')) or None
+    )
+    yield
+    await app.state.calculators.aclose()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Route Evaluation API",
     description="API để tính toán và đánh giá khoảng cách, thời gian giữa 3 địa điểm",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Get default max_scale from environment variable
-DEFAULT_MAX_SCALE = int(os.getenv('MAX_SCALE', '5'))
+# Expose cache hit/miss counters at /metrics
+register_caches({
+    "geocode": geocode_cache,
+    "route": route_cache,
+    "response": response_cache
+})
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """Record request duration by endpoint for /metrics"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (e.g. /evaluate) to keep label cardinality low
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        REQUEST_DURATION.labels(endpoint, request.method, str(status)).observe(
+            time.perf_counter() - start
+        )
 
 # Response model
 class EvaluationResponse(BaseModel):
@@ -33,6 +138,132 @@ class EvaluationResponse(BaseModel):
             }
         }
 
+class BatchEvaluationRequest(BaseModel):
+    work_address: str
+    gym_address: str
+    home_addresses: List[str]
+    api_key: Optional[str] = None
+    max_scale: int = DEFAULT_MAX_SCALE
+    top_k: Optional[int] = None
+    prefilter_top_k: Optional[int] = None
+    prefilter_min_rating: Optional[float] = None
+    detour_factor: float = DEFAULT_DETOUR_FACTOR
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "work_address": "Đại học Thương Mại, Hà Nội",
+                "gym_address": "Bến xe Mỹ Đình, Hà Nội",
+                "home_addresses": [
+                    "Công viên Cầu Giấy, Hà Nội",
+                    "Royal City, Hà Nội"
+                ],
+                "max_scale": 5
+            }
+        }
+
+class RankedHome(BaseModel):
+    rank: int
+    home_address: str
+    rating: float
+    G: float
+    T: float
+
+class BatchEvaluationResponse(BaseModel):
+    results: List[RankedHome]
+    failed: List[str]
+    pruned: List[str]
+
+class HeatmapRequest(BaseModel):
+    work_address: str
+    gym_address: str
+    bbox: List[float]
+    resolution: int = 50
+    refine_quantile: float = DEFAULT_REFINE_QUANTILE
+    format: str = "geojson"
+    api_key: Optional[str] = None
+    max_scale: int = DEFAULT_MAX_SCALE
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "work_address": "Đại học Thương Mại, Hà Nội",
+                "gym_address": "Bến xe Mỹ Đình, Hà Nội",
+                "bbox": [21.00, 105.76, 21.06, 105.82],
+                "resolution": 50,
+                "format": "geojson"
+            }
+        }
+
+class _BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that starts listening for client disconnects only after
+    the request body has been read.
+    
+    Both read the same ASGI receive channel; listening earlier would swallow
+    body chunks the response is still parsing.
+    """
+    
+    def __init__(self, content, body_done: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_done = body_done
+    
+    async def listen_for_disconnect(self, receive):
+        await self.body_done.wait()
+        await super().listen_for_disconnect(receive)
+
+def resolve_api_key(api_key: Optional[str]) -> str:
+    """Use the API key from the request, falling back to GOONG_API_KEY"""
+    used_api_key = api_key or os.getenv('GOONG_API_KEY')
+    
+    if not used_api_key:
+        raise HTTPException(
+            status_code=400,
+            detail="API key is required. Provide it in request body or set GOONG_API_KEY environment variable."
+        )
+    
+    return used_api_key
+
+async def evaluate_triple(calculator, work_address, home_address, gym_address, max_scale):
+    """
+    Evaluate one work/home/gym triple.
+    
+    Returns:
+        dict: {'rating', 'G', 'T'} rounded to 2 decimals
+    
+    Raises:
+        HTTPException: 400 if the addresses can't be geocoded or routed
+    """
+    # Get distances and times
+    result = await calculator.get_location_n_time(
+        work_address,
+        home_address,
+        gym_address
+    )
+    
+    # Check if geocoding was successful
+    if result is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Failed to geocode one or more addresses. Please check the addresses."
+        )
+    
+    dis_workhome, time_workhome, dis_homegym, time_homegym, dis_workgym, time_workgym = result
+    
+    # Calculate rating
+    rating, G, T, dRate, tRate = calculate_points_G_n_T(
+        dis_workhome, time_workhome,
+        dis_homegym, time_homegym,
+        dis_workgym, time_workgym,
+        max_scale=max_scale
+    )
+    
+    return {
+        "rating": round(rating, 2),
+        "G": round(G, 2),
+        "T": round(T, 2)
+    }
+
 @app.get("/")
 def read_root():
     """Health check endpoint"""
@@ -40,12 +271,34 @@ def read_root():
         "status": "running",
         "message": "Route Evaluation API is running",
         "endpoints": {
-            "POST /evaluate": "Đánh giá vị trí nhà giữa công ty và phòng gym"
+            "POST /evaluate": "Đánh giá vị trí nhà giữa công ty và phòng gym",
+            "POST /evaluate/batch": "Xếp hạng nhiều địa chỉ nhà cho cùng công ty và phòng gym",
+            "POST /evaluate/stream": "Đánh giá lô lớn, trả kết quả NDJSON theo từng dòng",
+            "POST /heatmap": "Bản đồ nhiệt điểm đánh giá trên lưới vị trí nhà trong một vùng",
+            "GET /cache/stats": "Thống kê hit/miss của cache",
+            "GET /metrics": "Metrics dạng Prometheus"
         }
     }
 
+@app.get("/cache/stats")
+def cache_stats():
+    """Cache hit/miss counters"""
+    return {
+        "geocode": geocode_cache.stats(),
+        "route": route_cache.stats(),
+        "response": response_cache.stats()
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics"""
+    content, content_type = render_latest()
+    return Response(content=content, media_type=content_type)
+
 @app.post("/evaluate", response_model=EvaluationResponse)
-def evaluate_location(
+async def evaluate_location(
+    request: Request,
+    response: Response,
     work_address: str = Form(..., description="Địa chỉ công ty"),
     home_address: str = Form(..., description="Địa chỉ nhà"),
     gym_address: str = Form(..., description="Địa chỉ phòng gym"),
@@ -71,46 +324,211 @@ def evaluate_location(
     """
     try:
         # Get API key
-        used_api_key = api_key or os.getenv('GOONG_API_KEY')
+        used_api_key = resolve_api_key(api_key)
         
-        if not used_api_key:
-            raise HTTPException(
-                status_code=400,
-                detail="API key is required. Provide it in request body or set GOONG_API_KEY environment variable."
+        # Reuse the calculator (and its pooled connections) for this API key
+        calculator = request.app.state.calculators.get(used_api_key)
+        
+        async def compute():
+            return await evaluate_triple(
+                calculator, work_address, home_address, gym_address, max_scale
             )
         
-        # Initialize calculator
-        calculator = RouteCalculator(used_api_key)
+        # Identical concurrent requests share one computation; results are cached
+        key = canonical_key(work_address, home_address, gym_address, max_scale)
+        evaluation = await response_cache.get_or_compute(key, compute)
+        
+        etag = make_etag(evaluation)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"private, max-age={response_cache.ttl}"
+        }
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        
+        response.headers.update(headers)
+        
+        # Prepare response
+        return EvaluationResponse(**evaluation)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+@app.post("/evaluate/batch", response_model=BatchEvaluationResponse)
+async def evaluate_batch(request: Request, body: BatchEvaluationRequest):
+    """
+    Xếp hạng nhiều địa chỉ nhà cho cùng một cặp công ty - phòng gym.
+    
+    Công ty và phòng gym chỉ geocode một lần, các quãng đường nhà<->công ty và
+    nhà<->gym được gom vào ít request DistanceMatrix nhất có thể.
+    
+    Returns:
+    - **results**: Danh sách nhà theo thứ tự điểm giảm dần
+    - **failed**: Các địa chỉ nhà không thể đánh giá
+    - **pruned**: Các địa chỉ nhà bị loại bởi bộ lọc sơ bộ (prefilter_top_k, prefilter_min_rating)
+    """
+    try:
+        calculator = request.app.state.calculators.get(resolve_api_key(body.api_key))
         
-        # Get distances and times
-        dis_workhome, time_workhome, dis_homegym, time_homegym, dis_workgym, time_workgym = \
-            calculator.get_location_n_time(
-                work_address,
-                home_address,
-                gym_address
+        with scheduling_priority(BATCH):
+            evaluation = await calculator.evaluate_homes(
+                body.work_address,
+                body.gym_address,
+                body.home_addresses,
+                max_scale=body.max_scale,
+                k=body.top_k,
+                prefilter_k=body.prefilter_top_k,
+                prefilter_min_rating=body.prefilter_min_rating,
+                detour_factor=body.detour_factor
             )
         
-        # Check if geocoding was successful
-        if dis_workhome is None:
+        if evaluation is None:
             raise HTTPException(
                 status_code=400,
-                detail="Failed to geocode one or more addresses. Please check the addresses."
+                detail="Failed to geocode or route work/gym addresses. Please check the addresses."
             )
         
-        # Calculate rating
-        rating, G, T, dRate, tRate = calculate_points_G_n_T(
-            dis_workhome, time_workhome,
-            dis_homegym, time_homegym,
-            dis_workgym, time_workgym,
-            max_scale=max_scale
+        ranked, failed, pruned = evaluation
+        return BatchEvaluationResponse(
+            results=[
+                RankedHome(
+                    rank=rank,
+                    home_address=item['home_address'],
+                    rating=round(item['rating'], 2),
+                    G=round(item['G'], 2),
+                    T=round(item['T'], 2)
+                )
+                for rank, item in enumerate(ranked, 1)
+            ],
+            failed=failed,
+            pruned=pruned
         )
         
-        # Prepare response
-        return EvaluationResponse(
-            rating=round(rating, 2),
-            G=round(G, 2),
-            T=round(T, 2)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
         )
+
+@app.post("/evaluate/stream")
+async def evaluate_stream(
+    request: Request,
+    api_key: Optional[str] = None,
+    max_scale: int = DEFAULT_MAX_SCALE,
+    concurrency: int = DEFAULT_STREAM_CONCURRENCY
+):
+    """
+    Đánh giá lô lớn dạng streaming.
+    
+    Request body là NDJSON, mỗi dòng một bộ địa chỉ:
+    `{"id": "optional", "work_address": "...", "home_address": "...", "gym_address": "..."}`
+    
+    Response là NDJSON, mỗi dòng một kết quả ngay khi tính xong (không theo thứ tự):
+    - `{"index": 0, "id": ..., "rating": ..., "G": ..., "T": ...}`
+    - `{"index": 1, "id": ..., "error": "..."}` nếu dòng đó lỗi (các dòng khác vẫn chạy tiếp)
+    """
+    calculator = request.app.state.calculators.get(resolve_api_key(api_key))
+    concurrency = max(1, min(concurrency, MAX_STREAM_CONCURRENCY))
+    
+    async def evaluate_line(indexed_item):
+        index, item = indexed_item
+        output = {"index": index}
+        
+        try:
+            if isinstance(item, Exception):
+                raise item
+            if "id" in item:
+                output["id"] = item["id"]
+            
+            work_address = item["work_address"]
+            home_address = item["home_address"]
+            gym_address = item["gym_address"]
+            
+            key = canonical_key(work_address, home_address, gym_address, max_scale)
+            with scheduling_priority(BATCH):
+                output.update(await response_cache.get_or_compute(
+                    key,
+                    lambda: evaluate_triple(calculator, work_address, home_address, gym_address, max_scale)
+                ))
+        except HTTPException as e:
+            output["error"] = e.detail
+        except KeyError as e:
+            output["error"] = f"Missing field: {e.args[0]}"
+        except Exception as e:
+            output["error"] = str(e)
+        
+        return output
+    
+    # The body is parsed while it arrives, so memory stays bounded by the queues
+    # rather than by the batch size
+    body_done = asyncio.Event()
+    
+    async def chunks():
+        try:
+            async for chunk in request.stream():
+                yield chunk
+        finally:
+            body_done.set()
+    
+    async def lines():
+        async for output in run_bounded(iter_ndjson(chunks()), evaluate_line, concurrency):
+            yield json.dumps(output, ensure_ascii=False) + "\n"
+    
+    return _BodyStreamingResponse(lines(), body_done, media_type="application/x-ndjson")
+
+@app.post("/heatmap")
+async def heatmap(request: Request, body: HeatmapRequest):
+    """
+    Bản đồ nhiệt điểm đánh giá trên lưới vị trí nhà trong khung `bbox`
+    ([south, west, north, east]) cho cùng một cặp công ty - phòng gym.
+    
+    Lưới `resolution` × `resolution` được tính từ thô tới mịn, chỉ chia nhỏ các
+    ô có điểm thuộc nhóm cao (`refine_quantile`, 0 = tính cả lưới).
+    
+    Returns:
+    - **format=geojson**: FeatureCollection các Point với `rating`, `G`, `T`, `step`
+    - **format=grid**: `lats`, `lngs` và mảng `rating[i][j]` (null = chưa tính)
+    """
+    if len(body.bbox) != 4 or body.bbox[0] >= body.bbox[2] or body.bbox[1] >= body.bbox[3]:
+        raise HTTPException(status_code=400, detail="bbox must be [south, west, north, east]")
+    if not 2 <= body.resolution <= MAX_HEATMAP_RESOLUTION:
+        raise HTTPException(
+            status_code=400,
+            detail=f"resolution must be between 2 and {MAX_HEATMAP_RESOLUTION}"
+        )
+    if not 0 <= body.refine_quantile <= 1:
+        raise HTTPException(status_code=400, detail="refine_quantile must be between 0 and 1")
+    if body.format not in ("geojson", "grid"):
+        raise HTTPException(status_code=400, detail="format must be 'geojson' or 'grid'")
+    
+    try:
+        calculator = request.app.state.calculators.get(resolve_api_key(body.api_key))
+        
+        with scheduling_priority(BATCH):
+            work, gym = await calculator.geocode_multiple_addresses([body.work_address, body.gym_address])
+            result = None
+            if work and gym:
+                result = await build_heatmap(
+                    calculator, work, gym, tuple(body.bbox),
+                    resolution=body.resolution,
+                    max_scale=body.max_scale,
+                    refine_quantile=body.refine_quantile
+                )
+        
+        if result is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Failed to geocode or route work/gym addresses. Please check the addresses."
+            )
+        
+        return to_geojson(result) if body.format == "geojson" else to_grid(result)
         
     except HTTPException:
         raise
@@ -0,0 +1,370 @@
+import asyncio
+
+import httpx
+import numpy as np
+
+from get_3_point import (
+    RouteCalculator,
+    parse_distance_matrix,
+    parse_geocode_response,
+    routes_to_distances_and_times,
+    unpack_distances_and_times,
+)
+from matrix_planner import MatrixPlanner
+from metrics import observe_upstream
+from prefilter import DEFAULT_DETOUR_FACTOR
+from scoring import calculate_points_G_n_T_array, top_k
+
+
+class AsyncRouteCalculator(RouteCalculator):
+    """
+    Async variant of RouteCalculator built on httpx.AsyncClient.
+
+    Public methods have the same names and return values as RouteCalculator
+    but are coroutines: addresses are geocoded concurrently and all planned
+    DistanceMatrix requests are sent concurrently.
+    """
+
+    def __init__(self, api_key, geocode_cache=None, route_cache=None, client=None,
+                 routing_backend=None, scheduler=None):
+        """
+        Initialize the AsyncRouteCalculator with Goong Maps API key.
+
+        Args:
+            api_key (str): Your Goong Maps API key
+            geocode_cache (GeocodeCache): Optional cache for geocode results
+            route_cache (RouteCache): Optional cache for route results
+            client (httpx.AsyncClient): Optional shared HTTP client; if omitted
+                the calculator creates and owns one
+            routing_backend: Optional local backend used instead of DistanceMatrix
+            scheduler (GoongScheduler): Optional per-key scheduler; when set every
+                Goong call waits for quota and matrix calls may be merged
+        """
+        super().__init__(
+            api_key,
+            geocode_cache=geocode_cache,
+            route_cache=route_cache,
+            routing_backend=routing_backend
+        )
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient()
+        self.scheduler = scheduler
+
+    def _create_session(self):
+        # Requests go through self.client; no sync requests.Session needed
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the HTTP client if this calculator created it."""
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def geocode_address(self, address):
+        """
+        Convert text address to coordinates (latitude, longitude).
+
+        Args:
+            address (str): Text address to geocode
+
+        Returns:
+            dict: {'address': str, 'lat': float, 'lng': float}, or None
+        """
+        if self.geocode_cache is not None:
+            cached = self.geocode_cache.get(address)
+            if cached is not None:
+                return cached
+
+        try:
+            if self.scheduler is not None:
+                data = await self.scheduler.call(lambda: self._fetch_geocode(address))
+            else:
+                data = await self._fetch_geocode(address)
+
+            geocoded = parse_geocode_response(data, address)
+
+            if geocoded is None:
+                print(f"Không tìm thấy tọa độ cho địa chỉ: {address}")
+            elif self.geocode_cache is not None:
+                await self.geocode_cache.aset(address, geocoded)
+
+            return geocoded
+
+        except Exception as e:
+            print(f"Lỗi khi geocode địa chỉ '{address}': {str(e)}")
+            return None
+
+    async def geocode_multiple_addresses(self, addresses):
+        """
+        Geocode multiple addresses concurrently.
+
+        Args:
+            addresses (list): List of text addresses
+
+        Returns:
+            list: List of geocoded results (None for addresses not found)
+        """
+        unique_addresses = list(dict.fromkeys(addresses))
+        results = await asyncio.gather(
+            *(self.geocode_address(address) for address in unique_addresses)
+        )
+        by_address = dict(zip(unique_addresses, results))
+
+        return [by_address[address] for address in addresses]
+
+    async def calculate_distance_matrix(self, origins, destinations, vehicle='car'):
+        """
+        Calculate distance and travel time between multiple origins and destinations.
+
+        Args:
+            origins (list): List of origin coordinates as tuples (lat, lng)
+            destinations (list): List of destination coordinates as tuples (lat, lng)
+            vehicle (str): Vehicle type - 'car', 'bike', 'taxi', 'truck', 'hd'
+
+        Returns:
+            dict: Distance matrix results
+        """
+        try:
+            if self.scheduler is not None:
+                return await self.scheduler.matrix(origins, destinations, vehicle, self._fetch_matrix)
+            return await self._fetch_matrix(origins, destinations, vehicle)
+
+        except Exception as e:
+            print(f"Lỗi khi tính khoảng cách: {str(e)}")
+            return None
+
+    async def _fetch_geocode(self, address):
+        """Send one geocode request; raises on HTTP errors."""
+        with observe_upstream('geocode', self.api_key):
+            response = await self.client.get(self.geocode_url, params=self._geocode_params(address))
+            response.raise_for_status()
+        return response.json()
+
+    async def _fetch_matrix(self, origins, destinations, vehicle):
+        """Send one DistanceMatrix request; raises on HTTP errors."""
+        with observe_upstream('distance_matrix', self.api_key):
+            response = await self.client.get(
+                self.distance_matrix_url,
+                params=self._matrix_params(origins, destinations, vehicle)
+            )
+            response.raise_for_status()
+        return response.json()
+
+    async def calculate_routes(self, pairs, vehicle='car'):
+        """
+        Calculate many routes, sending all planned matrix requests concurrently.
+
+        Args:
+            pairs (list): List of (origin, destination) tuples, each a (lat, lng)
+            vehicle (str): Vehicle type
+
+        Returns:
+            dict: {(origin, destination): route dict or None}
+        """
+        results = {}
+        planner = MatrixPlanner()
+
+        for origin, destination in pairs:
+            pair = (tuple(origin), tuple(destination))
+            cached = self._get_cached_route(pair[0], pair[1], vehicle)
+            if cached is not None:
+                results[pair] = cached
+            else:
+                planner.add(*pair)
+
+        async def fetch_matrix(origins, destinations):
+            return parse_distance_matrix(
+                await self.calculate_distance_matrix(origins, destinations, vehicle)
+            )
+
+        if self.routing_backend is not None:
+            # CPU-bound search runs in a thread to keep the event loop free
+            fetched = await asyncio.to_thread(
+                self.routing_backend.route_pairs, planner.pairs, vehicle
+            )
+        else:
+            fetched = await planner.execute_async(fetch_matrix)
+
+        if self.route_cache is not None:
+            # One transaction per call, off the event loop
+            await self.route_cache.aset_many(
+                {pair: route for pair, route in fetched.items() if route is not None}, vehicle
+            )
+        results.update(fetched)
+
+        return results
+
+    async def get_distances_and_times(self, location1, location2, location3, vehicle='bike'):
+        """
+        Get 3 distances (km) and 3 times (minutes) for 3 locations.
+
+        Args:
+            location1, location2, location3: Dictionaries with 'lat' and 'lng'
+            vehicle (str): Vehicle type - 'car', 'bike', 'taxi', 'truck', 'hd'
+
+        Returns:
+            tuple: (distances, times), or (None, None) if error occurs
+        """
+        if not all([location1, location2, location3]):
+            print("Lỗi: Một hoặc nhiều địa chỉ không có tọa độ hợp lệ")
+            return None, None
+
+        coord1 = (location1['lat'], location1['lng'])
+        coord2 = (location2['lat'], location2['lng'])
+        coord3 = (location3['lat'], location3['lng'])
+
+        routes = await self.calculate_routes(
+            [(coord1, coord2), (coord2, coord3), (coord1, coord3)],
+            vehicle
+        )
+        route_1_2 = routes[(coord1, coord2)]
+        route_2_3 = routes[(coord2, coord3)]
+        route_1_3 = routes[(coord1, coord3)]
+
+        if not all([route_1_2, route_2_3, route_1_3]):
+            print("Lỗi: Không thể tính toán tuyến đường")
+            return None, None
+
+        return routes_to_distances_and_times(route_1_2, route_2_3, route_1_3)
+
+    async def calculate_single_route(self, origin, destination, vehicle='car'):
+        """
+        Calculate distance and time for a single route.
+
+        Args:
+            origin: Tuple (lat, lng)
+            destination: Tuple (lat, lng)
+            vehicle: Vehicle type
+
+        Returns:
+            dict: Route information
+        """
+        routes = await self.calculate_routes([(origin, destination)], vehicle)
+        return routes[(tuple(origin), tuple(destination))]
+
+    async def get_location_n_time(self, work_location, home_location, gym_location):
+        locations = await self.geocode_multiple_addresses(
+            [work_location, home_location, gym_location]
+        )
+
+        if all(locations):
+            distances, times = await self.get_distances_and_times(
+                locations[0],
+                locations[1],
+                locations[2],
+                vehicle='bike'
+            )
+
+            if distances and times:
+                return unpack_distances_and_times(distances, times)
+
+        return None
+
+    async def evaluate_homes(self, work_location, gym_location, home_locations,
+                             max_scale=5, vehicle='bike', k=None, prefilter_k=None,
+                             prefilter_min_rating=None, detour_factor=DEFAULT_DETOUR_FACTOR):
+        """
+        Rank many candidate homes against one work/gym pair.
+
+        Work and gym are geocoded once, all homes are geocoded concurrently and
+        every home<->work / home<->gym leg is fetched in as few matrix requests
+        as the planner allows.
+
+        Args:
+            work_location (str): Work address
+            gym_location (str): Gym address
+            home_locations (list): Candidate home addresses
+            max_scale (int): Maximum score
+            vehicle (str): Vehicle type
+            k (int): Only return the k best homes (default: all)
+            prefilter_k (int): Only route the prefilter_k best homes by
+                great-circle estimate (see prefilter_candidates)
+            prefilter_min_rating (float): Only route homes whose estimated
+                rating reaches this value
+            detour_factor (float): Detour factor for the prefilter estimate
+
+        Returns:
+            tuple: (ranked, failed, pruned) where ranked is a list of dicts
+                   {'home_address', 'rating', 'G', 'T'} sorted by rating (best
+                   first), failed is the list of home addresses that could
+                   not be evaluated and pruned the list dropped by the
+                   prefilter. Returns None if work or gym can't be routed.
+        """
+        locations = await self.geocode_multiple_addresses(
+            [work_location, gym_location] + list(home_locations)
+        )
+        work, gym, homes = locations[0], locations[1], locations[2:]
+
+        if not work or not gym:
+            return None
+
+        failed = [address for address, home in zip(home_locations, homes) if not home]
+        pruned = []
+        candidates = [(address, home) for address, home in zip(home_locations, homes) if home]
+
+        if prefilter_k is not None or prefilter_min_rating is not None:
+            keep = set(self.prefilter_candidates(
+                work, gym, [home for _, home in candidates],
+                k=prefilter_k,
+                min_rating=prefilter_min_rating,
+                detour_factor=detour_factor,
+                max_scale=max_scale
+            ))
+            pruned = [address for i, (address, _) in enumerate(candidates) if i not in keep]
+            candidates = [candidate for i, candidate in enumerate(candidates) if i in keep]
+
+        coord_work = (work['lat'], work['lng'])
+        coord_gym = (gym['lat'], gym['lng'])
+
+        pairs = [(coord_work, coord_gym)]
+        for _, home in candidates:
+            coord_home = (home['lat'], home['lng'])
+            pairs += [(coord_work, coord_home), (coord_home, coord_gym)]
+
+        routes = await self.calculate_routes(pairs, vehicle)
+
+        route_workgym = routes[(coord_work, coord_gym)]
+        if not route_workgym:
+            return None
+
+        routed = []
+        legs = []
+        for address, home in candidates:
+            coord_home = (home['lat'], home['lng'])
+            route_workhome = routes[(coord_work, coord_home)]
+            route_homegym = routes[(coord_home, coord_gym)]
+            if not route_workhome or not route_homegym:
+                failed.append(address)
+                continue
+
+            distances, times = routes_to_distances_and_times(
+                route_workhome, route_homegym, route_workgym
+            )
+            routed.append(address)
+            legs.append(unpack_distances_and_times(distances, times))
+
+        # One column per input of calculate_points_G_n_T
+        columns = np.array(legs, dtype=float).reshape(-1, 6).T
+        rating, G, T, dRate, tRate = calculate_points_G_n_T_array(
+            *columns, max_scale=max_scale, clip=False
+        )
+
+        # Homes with invalid legs (e.g. zero distances) get a NaN rating
+        failed += [address for address, value in zip(routed, rating) if np.isnan(value)]
+        best = top_k(rating, len(routed) if k is None else k)
+
+        ranked = [
+            {
+                'home_address': routed[i],
+                'rating': float(rating[i]),
+                'G': float(G[i]),
+                'T': float(T[i])
+            }
+            for i in best
+        ]
+        return ranked, failed, pruned
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Chuyển bản trích OSM (.osm XML) thành đồ thị .npz cho local_routing.RoadGraph.
+
+Ví dụ:
+    python build_road_graph.py hanoi.osm hanoi_graph.npz
+
+File .osm có thể lấy từ Overpass API hoặc cắt từ bản Geofabrik Vietnam
+(osmium extract ... -o hanoi.osm).
+"""
+
+import argparse
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from local_routing import ROAD_CLASSES
+from prefilter import haversine_km
+
+# Giá trị tag highway -> loại đường trong ROAD_CLASSES
+HIGHWAY_CLASSES = {
+    'motorway': 'motorway', 'motorway_link': 'motorway',
+    'trunk': 'trunk', 'trunk_link': 'trunk',
+    'primary': 'primary', 'primary_link': 'primary',
+    'secondary': 'secondary', 'secondary_link': 'secondary',
+    'tertiary': 'tertiary', 'tertiary_link': 'tertiary',
+    'residential': 'residential', 'unclassified': 'residential',
+    'living_street': 'residential', 'road': 'residential',
+    'service': 'service',
+}
+
+
+def parse_osm(path):
+    """
+    Đọc nút và các đoạn đường từ file .osm.
+
+    Returns:
+        tuple: (coords, edges) với coords = {osm_id: (lat, lng)} và
+               edges = list (from_osm_id, to_osm_id, road_class)
+    """
+    coords = {}
+    edges = []
+
+    for _, element in ET.iterparse(path, events=('end',)):
+        if element.tag == 'node':
+            coords[element.get('id')] = (float(element.get('lat')), float(element.get('lon')))
+            element.clear()
+        elif element.tag == 'way':
+            tags = {tag.get('k'): tag.get('v') for tag in element.findall('tag')}
+            road = HIGHWAY_CLASSES.get(tags.get('highway'))
+            if road is not None:
+                refs = [nd.get('ref') for nd in element.findall('nd')]
+                road_class = ROAD_CLASSES.index(road)
+                oneway = tags.get('oneway')
+                forward = oneway != '-1'
+                backward = oneway not in ('yes', 'true', '1') or oneway == '-1'
+                # Vòng xuyến và cao tốc mặc định là đường một chiều
+                if oneway is None and (tags.get('junction') == 'roundabout' or road == 'motorway'):
+                    backward = False
+
+                for a, b in zip(refs, refs[1:]):
+                    if forward:
+                        edges.append((a, b, road_class))
+                    if backward:
+                        edges.append((b, a, road_class))
+            element.clear()
+
+    return coords, edges
+
+
+def build_graph(coords, edges):
+    """
+    Đóng gói nút/cạnh thành mảng CSR.
+
+    Returns:
+        dict: Các mảng node_lat, node_lng, indptr, indices, length_m, road_class
+    """
+    edges = [edge for edge in edges if edge[0] in coords and edge[1] in coords]
+    used = sorted({osm_id for a, b, _ in edges for osm_id in (a, b)})
+    index = {osm_id: i for i, osm_id in enumerate(used)}
+
+    node_lat = np.array([coords[osm_id][0] for osm_id in used])
+    node_lng = np.array([coords[osm_id][1] for osm_id in used])
+
+    sources = np.array([index[a] for a, _, _ in edges], dtype=np.int64)
+    targets = np.array([index[b] for _, b, _ in edges], dtype=np.int64)
+    classes = np.array([c for _, _, c in edges], dtype=np.uint8)
+
+    order = np.argsort(sources, kind='stable')
+    sources, targets, classes = sources[order], targets[order], classes[order]
+
+    length_m = haversine_km(node_lat[sources], node_lng[sources],
+                            node_lat[targets], node_lng[targets]) * 1000
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=len(used)))))
+
+    return {
+        'node_lat': node_lat,
+        'node_lng': node_lng,
+        'indptr': indptr.astype(np.int64),
+        'indices': targets.astype(np.int32),
+        'length_m': length_m.astype(np.float32),
+        'road_class': classes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a road graph (.npz) from an OSM extract')
+    parser.add_argument('osm_file', help='Input .osm XML file')
+    parser.add_argument('output', help='Output .npz file')
+    args = parser.parse_args()
+
+    print(f"📖 Đang đọc {args.osm_file}...")
+    coords, edges = parse_osm(args.osm_file)
+
+    graph = build_graph(coords, edges)
+    np.savez_compressed(args.output, **graph)
+    print(f"✅ Đã lưu {len(graph['node_lat'])} nút, {len(graph['indices'])} cạnh vào {args.output}")
+
+
+if __name__ == '__main__':
+    main()
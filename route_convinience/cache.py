@@ -0,0 +1,70 @@
+"""
+Cache LRU trong bộ nhớ có TTL, dùng chung cho geocode và route cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Cache LRU giới hạn kích thước, mỗi phần tử có thời hạn (TTL) riêng.
+    An toàn khi dùng từ nhiều thread.
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        """
+        Args:
+            max_size (int): Số phần tử tối đa, phần tử ít dùng nhất bị loại trước
+            ttl (float): Thời hạn mặc định (giây), None = không hết hạn
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Lấy giá trị theo key.
+
+        Returns:
+            Giá trị đã lưu, hoặc None nếu không có hoặc đã hết hạn
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Lưu giá trị.
+
+        Args:
+            key: Key (hashable)
+            value: Giá trị cần lưu
+            ttl (float): Thời hạn (giây), mặc định dùng TTL của cache
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
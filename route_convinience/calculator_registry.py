@@ -0,0 +1,107 @@
+"""
+HTTP client dùng chung và registry các calculator theo API key.
+
+Tạo một lần khi ứng dụng khởi động (lifespan) để mọi request dùng lại
+connection pool keep-alive tới rsapi.goong.io thay vì bắt tay TCP/TLS mới.
+"""
+
+import httpx
+
+from async_route_calculator import AsyncRouteCalculator
+from cache import LRUCache
+from scheduler import GoongScheduler
+
+
+def create_async_client(max_connections=100, max_keepalive_connections=20,
+                        keepalive_expiry=30.0, timeout=10.0, connect_timeout=3.0):
+    """
+    Tạo httpx.AsyncClient với connection pool keep-alive.
+
+    Args:
+        max_connections (int): Số kết nối đồng thời tối đa
+        max_keepalive_connections (int): Số kết nối rảnh được giữ lại
+        keepalive_expiry (float): Thời gian giữ kết nối rảnh (giây)
+        timeout (float): Timeout đọc/ghi/chờ pool (giây)
+        connect_timeout (float): Timeout khi mở kết nối (giây)
+
+    Returns:
+        httpx.AsyncClient
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
+
+
+class CalculatorRegistry:
+    """
+    Giữ một AsyncRouteCalculator cho mỗi API key, tất cả dùng chung HTTP client
+    và cache. Nếu có rate_limit, mỗi key có một GoongScheduler riêng.
+
+    Scheduler được giữ riêng, không theo LRU của calculator: calculator bị loại
+    khỏi cache rồi tạo lại vẫn dùng đúng token bucket (quota) của key đó.
+    """
+
+    def __init__(self, client, geocode_cache=None, route_cache=None, routing_backend=None,
+                 max_size=128, rate_limit=None, rate_burst=None):
+        """
+        Args:
+            client (httpx.AsyncClient): HTTP client dùng chung
+            geocode_cache (GeocodeCache): Cache geocode dùng chung
+            route_cache (RouteCache): Cache route dùng chung
+            routing_backend: Backend routing offline (thay cho DistanceMatrix) nếu có
+            max_size (int): Số API key tối đa được giữ calculator
+            rate_limit (float): Quota mỗi key (request/giây), None = không giới hạn
+            rate_burst (int): Số request được gửi dồn của mỗi key
+        """
+        self.client = client
+        self.geocode_cache = geocode_cache
+        self.route_cache = route_cache
+        self.routing_backend = routing_backend
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+        self._calculators = LRUCache(max_size=max_size)
+        self._schedulers = {}
+
+    def get(self, api_key):
+        """
+        Lấy (hoặc tạo) calculator cho một API key.
+
+        Returns:
+            AsyncRouteCalculator
+        """
+        calculator = self._calculators.get(api_key)
+        if calculator is None:
+            calculator = AsyncRouteCalculator(
+                api_key,
+                geocode_cache=self.geocode_cache,
+                route_cache=self.route_cache,
+                client=self.client,
+                routing_backend=self.routing_backend,
+                scheduler=self.scheduler(api_key)
+            )
+            self._calculators.set(api_key, calculator)
+        return calculator
+
+    def scheduler(self, api_key):
+        """
+        Scheduler (quota) của một API key, None nếu không giới hạn rate.
+
+        Returns:
+            GoongScheduler
+        """
+        if not self.rate_limit:
+            return None
+        scheduler = self._schedulers.get(api_key)
+        if scheduler is None:
+            scheduler = self._schedulers[api_key] = GoongScheduler(self.rate_limit, self.rate_burst)
+        return scheduler
+
+    async def aclose(self):
+        """Đóng HTTP client dùng chung."""
+        self._calculators.clear()
+        await self.client.aclose()
@@ -0,0 +1,161 @@
+"""
+Cache kết quả geocode theo địa chỉ đã chuẩn hóa.
+
+Cùng một địa chỉ có thể được viết nhiều kiểu ("Q.1, TP.HCM", "quận 1 tp hcm",
+"Quận 1, Thành phố HCM", dấu kiểu cũ/mới...). normalize_address() đưa các biến
+thể này về một key chung để dùng lại kết quả geocode, tiết kiệm quota Goong.
+"""
+
+import asyncio
+import re
+import threading
+import time
+import unicodedata
+
+from cache import LRUCache
+from shared_cache import SharedCache
+
+# Thời hạn mặc định của một kết quả geocode (30 ngày)
+DEFAULT_TTL = 30 * 24 * 3600
+
+# Dấu thanh ở dạng NFD: huyền, sắc, ngã, hỏi, nặng
+_TONES = '\u0300\u0301\u0303\u0309\u0323'
+
+# Kiểu bỏ dấu cũ/mới chỉ khác vị trí dấu thanh: "hòa"/"hoà", "khỏe"/"khoẻ", "thủy"/"thuỷ".
+# Đưa về một kiểu (dấu trên nguyên âm sau); các dấu khác vẫn giữ vì làm đổi nghĩa
+_TONE_PLACEMENT = [
+    (re.compile(f'o([{_TONES}])([ae])'), r'o\2\1'),
+    (re.compile(f'u([{_TONES}])y'), r'uy\1'),
+]
+
+# Các từ viết tắt phổ biến trong địa chỉ Việt Nam (chữ thường). Chỉ mở rộng các
+# từ không nhập nhằng: "P." có thể là Phường hoặc Phố nên chỉ mở rộng khi đi với số
+_ABBREVIATIONS = [
+    (re.compile(r'\btp\.?\s*hcm\b'), 'thành phố hồ chí minh'),
+    (re.compile(r'\bhcm\b'), 'hồ chí minh'),
+    (re.compile(r'\btp\.\s*|\btp\b'), 'thành phố '),
+    (re.compile(r'\btx\.\s*|\btx\b'), 'thị xã '),
+    (re.compile(r'\btt\.\s*|\btt\b'), 'thị trấn '),
+    (re.compile(r'\bq\.\s*|\bq\s*(?=\d)'), 'quận '),
+    (re.compile(r'\bp\.?\s*(?=\d)'), 'phường '),
+    (re.compile(r'\bh\.\s*'), 'huyện '),
+    (re.compile(r'\bx\.\s*'), 'xã '),
+    (re.compile(r'\bđ\.\s*'), 'đường '),
+]
+
+
+def normalize_address(address):
+    """
+    Chuẩn hóa địa chỉ để làm key cache.
+
+    Gộp các biến thể về chữ hoa/thường, khoảng trắng, dạng Unicode (NFC/NFD),
+    vị trí dấu thanh kiểu cũ/mới và các từ viết tắt như "Q.", "P.12", "TP.".
+    Dấu tiếng Việt được giữ nguyên ("Hàng Bạc" khác "Hàng Bác").
+
+    Args:
+        address (str): Địa chỉ gốc
+
+    Returns:
+        str: Địa chỉ đã chuẩn hóa
+    """
+    text = unicodedata.normalize('NFD', address.casefold())
+    for pattern, replacement in _TONE_PLACEMENT:
+        text = pattern.sub(replacement, text)
+    text = unicodedata.normalize('NFC', text)
+
+    for pattern, replacement in _ABBREVIATIONS:
+        text = pattern.sub(replacement, text)
+
+    # Bỏ dấu câu (giữ "/" và "-" của số nhà), gộp khoảng trắng
+    text = re.sub(r'[^\w/\-]+', ' ', text)
+    return ' '.join(text.split())
+
+
+class GeocodeCache:
+    """
+    Cache geocode hai tầng: LRU trong bộ nhớ và SQLite trên đĩa (dùng chung
+    giữa các worker, xem SharedCache), có TTL.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_size=4096, shared_max_rows=None):
+        """
+        Args:
+            path (str): Đường dẫn file SQLite, None = chỉ cache trong bộ nhớ
+            ttl (float): Thời hạn của một kết quả (giây)
+            max_size (int): Số địa chỉ tối đa giữ trong bộ nhớ
+            shared_max_rows (int): Số địa chỉ tối đa trong file chung, None = không giới hạn
+        """
+        self.ttl = ttl
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self._lock = threading.Lock()
+        self.shared = SharedCache(path, 'geocode', max_rows=shared_max_rows) if path else None
+
+    def get(self, address):
+        """
+        Lấy kết quả geocode đã lưu.
+
+        Returns:
+            dict: {'address': str, 'lat': float, 'lng': float}, hoặc None nếu chưa có
+        """
+        key = normalize_address(address)
+        result = self.memory.get(key)
+
+        shared_hit = False
+
+        if result is None and self.shared is not None:
+            row = self.shared.get(key)
+            if row is not None:
+                result, expires_at = row
+                self.memory.set(key, result, ttl=expires_at - time.time())
+                shared_hit = True
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.shared_hits += shared_hit
+
+        return result
+
+    def set(self, address, result):
+        """
+        Lưu kết quả geocode của một địa chỉ.
+
+        Args:
+            address (str): Địa chỉ gốc
+            result (dict): Kết quả geocode
+        """
+        key = normalize_address(address)
+        self.memory.set(key, result)
+
+        if self.shared is not None:
+            self.shared.set(key, result, self.ttl)
+
+    async def aset(self, address, result):
+        """Như set, nhưng ghi file chung trong thread để không chặn event loop."""
+        key = normalize_address(address)
+        self.memory.set(key, result)
+
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, key, result, self.ttl)
+
+    def stats(self):
+        """
+        Thống kê hit/miss của cache.
+
+        Returns:
+            dict: {'hits', 'misses', 'shared_hits', 'hit_ratio', 'size'};
+                  shared_hits là số hit đọc từ file chung (không có trong bộ nhớ)
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared_hits': self.shared_hits,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            'size': len(self.memory)
+        }
@@ -3,26 +3,48 @@ from datetime import datetime
 import os
 import urllib.parse
 from dotenv import load_dotenv
+from matrix_planner import MatrixPlanner
+from metrics import observe_upstream
+from prefilter import DEFAULT_DETOUR_FACTOR, select_candidates
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Goong REST API; đổi sang mock_goong_server.py khi benchmark offline
+GOONG_BASE_URL = os.getenv('GOONG_BASE_URL', 'https://rsapi.goong.io').rstrip('/')
+
 class RouteCalculator:
     """
     Class to handle geocoding, distance calculation, and travel time estimation
     using Goong Maps API (Vietnam mapping service).
     """
     
-    def __init__(self, api_key):
+    def __init__(self, api_key, geocode_cache=None, route_cache=None, session=None, timeout=None,
+                 routing_backend=None):
         """
         Initialize the RouteCalculator with Goong Maps API key.
         
         Args:
             api_key (str): Your Goong Maps API key
+            geocode_cache (GeocodeCache): Optional cache for geocode results
+            route_cache (RouteCache): Optional cache for route results
+            session (requests.Session): Optional shared session (keep-alive pool)
+            timeout (float): Optional timeout for upstream requests (seconds)
+            routing_backend: Optional local backend (e.g. LocalRoutingBackend)
+                with route_pairs(pairs, vehicle); used instead of DistanceMatrix
         """
         self.api_key = api_key
-        self.geocode_url = "https://rsapi.goong.io/geocode"
-        self.distance_matrix_url = "https://rsapi.goong.io/DistanceMatrix"
+        self.geocode_cache = geocode_cache
+        self.route_cache = route_cache
+        self.session = session if session is not None else self._create_session()
+        self.timeout = timeout
+        self.routing_backend = routing_backend
+        self.geocode_url = f"{GOONG_BASE_URL}/geocode"
+        self.distance_matrix_url = f"{GOONG_BASE_URL}/DistanceMatrix"
+    
+    def _create_session(self):
+        """Create the HTTP session used when none is shared by the caller."""
+        return requests.Session()
     
     def geocode_address(self, address):
         """
@@ -35,31 +57,28 @@ class RouteCalculator:
             dict: Dictionary containing address and coordinates
                   {'address': str, 'lat': float, 'lng': float}
         """
+        if self.geocode_cache is not None:
+            cached = self.geocode_cache.get(address)
+            if cached is not None:
+                return cached
+        
         try:
-            # URL encode the address
-            params = {
-                'address': address,
-                'api_key': self.api_key
-            }
+            with observe_upstream('geocode', self.api_key):
+                response = self.session.get(
+                    self.geocode_url,
+                    params=self._geocode_params(address),
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
             
-            response = requests.get(self.geocode_url, params=params)
-            response.raise_for_status()
+            geocoded = parse_geocode_response(response.json(), address)
             
-            data = response.json()
-            
-            if data.get('status') == 'OK' and data.get('results'):
-                result = data['results'][0]
-                location = result['geometry']['location']
-                formatted_address = result.get('formatted_address', address)
-                
-                return {
-                    'address': formatted_address,
-                    'lat': location['lat'],
-                    'lng': location['lng']
-                }
-            else:
+            if geocoded is None:
                 print(f"Không tìm thấy tọa độ cho địa chỉ: {address}")
-                return None
+            elif self.geocode_cache is not None:
+                self.geocode_cache.set(address, geocoded)
+            
+            return geocoded
                 
         except Exception as e:
             print(f"Lỗi khi geocode địa chỉ '{address}': {str(e)}")
@@ -98,19 +117,13 @@ class RouteCalculator:
             dict: Distance matrix results
         """
         try:
-            # Format origins and destinations as "lat,lng" strings
-            origins_str = '|'.join([f"{lat},{lng}" for lat, lng in origins])
-            destinations_str = '|'.join([f"{lat},{lng}" for lat, lng in destinations])
-            
-            params = {
-                'origins': origins_str,
-                'destinations': destinations_str,
-                'vehicle': vehicle,
-                'api_key': self.api_key
-            }
-            
-            response = requests.get(self.distance_matrix_url, params=params)
-            response.raise_for_status()
+            with observe_upstream('distance_matrix', self.api_key):
+                response = self.session.get(
+                    self.distance_matrix_url,
+                    params=self._matrix_params(origins, destinations, vehicle),
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
             
             data = response.json()
             return data
@@ -119,6 +132,43 @@ class RouteCalculator:
             print(f"Lỗi khi tính khoảng cách: {str(e)}")
             return None
     
+    def calculate_routes(self, pairs, vehicle='car'):
+        """
+        Calculate many routes with as few DistanceMatrix requests as possible.
+        
+        Args:
+            pairs (list): List of (origin, destination) tuples, each a (lat, lng)
+            vehicle (str): Vehicle type
+            
+        Returns:
+            dict: {(origin, destination): route dict or None}
+        """
+        results = {}
+        planner = MatrixPlanner()
+        
+        for origin, destination in pairs:
+            pair = (tuple(origin), tuple(destination))
+            cached = self._get_cached_route(pair[0], pair[1], vehicle)
+            if cached is not None:
+                results[pair] = cached
+            else:
+                planner.add(*pair)
+        
+        def fetch_matrix(origins, destinations):
+            return parse_distance_matrix(
+                self.calculate_distance_matrix(origins, destinations, vehicle)
+            )
+        
+        if self.routing_backend is not None:
+            fetched = self.routing_backend.route_pairs(planner.pairs, vehicle)
+        else:
+            fetched = planner.execute(fetch_matrix)
+        
+        self._set_cached_routes(fetched, vehicle)
+        results.update(fetched)
+        
+        return results
+    
     def get_distances_and_times(self, location1, location2, location3, vehicle='bike'):
         """
         Simplified function: Get 3 distances (km) and 3 times (minutes) for 3 locations.
@@ -142,30 +192,21 @@ class RouteCalculator:
         coord2 = (location2['lat'], location2['lng'])
         coord3 = (location3['lat'], location3['lng'])
         
-        # Calculate all pairwise distances
-        route_1_2 = self.calculate_single_route(coord1, coord2, vehicle)
-        route_2_3 = self.calculate_single_route(coord2, coord3, vehicle)
-        route_1_3 = self.calculate_single_route(coord1, coord3, vehicle)
+        # Calculate all pairwise distances in a single matrix request
+        routes = self.calculate_routes(
+            [(coord1, coord2), (coord2, coord3), (coord1, coord3)],
+            vehicle
+        )
+        route_1_2 = routes[(coord1, coord2)]
+        route_2_3 = routes[(coord2, coord3)]
+        route_1_3 = routes[(coord1, coord3)]
         
         # Check if all routes were calculated successfully
         if not all([route_1_2, route_2_3, route_1_3]):
             print("Lỗi: Không thể tính toán tuyến đường")
             return None, None
         
-        # Extract distances (km) and times (minutes)
-        distances = {
-            '1->2': route_1_2['distance'],
-            '2->3': route_2_3['distance'],
-            '1->3': route_1_3['distance']
-        }
-        
-        times = {
-            '1->2': round(route_1_2['duration_seconds'] / 60, 1),
-            '2->3': round(route_2_3['duration_seconds'] / 60, 1),
-            '1->3': round(route_1_3['duration_seconds'] / 60, 1)
-        }
-        
-        return distances, times
+        return routes_to_distances_and_times(route_1_2, route_2_3, route_1_3)
     
     def calculate_single_route(self, origin, destination, vehicle='car'):
         """
@@ -179,27 +220,80 @@ class RouteCalculator:
         Returns:
             dict: Route information
         """
+        if self.routing_backend is not None:
+            routes = self.calculate_routes([(origin, destination)], vehicle)
+            return routes[(tuple(origin), tuple(destination))]
+        
+        cached = self._get_cached_route(origin, destination, vehicle)
+        if cached is not None:
+            return cached
+        
         result = self.calculate_distance_matrix([origin], [destination], vehicle)
+        rows = parse_distance_matrix(result)
         
-        if result and 'rows' in result and len(result['rows']) > 0:
-            elements = result['rows'][0].get('elements', [])
-            if elements and elements[0].get('status') == 'OK':
-                element = elements[0]
-                
-                distance_meters = element['distance']['value']
-                distance_km = distance_meters / 1000
-                
-                duration_seconds = element['duration']['value']
-                duration_text = element['duration']['text']
-                
-                return {
-                    'distance': round(distance_km, 2),
-                    'distance_text': element['distance']['text'],
-                    'duration': duration_text,
-                    'duration_seconds': duration_seconds
-                }
+        if rows and rows[0]:
+            self._set_cached_route(origin, destination, vehicle, rows[0][0])
+            return rows[0][0]
         
         return None
+    
+    def prefilter_candidates(self, work_location, gym_location, home_locations, k=None,
+                             min_rating=None, max_distance_km=None,
+                             detour_factor=DEFAULT_DETOUR_FACTOR, max_scale=5):
+        """
+        Offline prefilter: pick the homes worth sending to the routing API.
+        
+        Ratings are estimated from great-circle distances (times a detour
+        factor) between the geocoded coordinates, without any upstream call.
+        
+        Args:
+            work_location, gym_location: Dictionaries with 'lat' and 'lng'
+            home_locations (list): Dictionaries with 'lat' and 'lng'
+            k (int): Keep at most the k best estimated homes
+            min_rating (float): Drop homes with a lower estimated rating
+            max_distance_km (float): Drop homes farther than this from work
+            detour_factor (float): Road distance / great-circle distance ratio
+            max_scale: Maximum score
+            
+        Returns:
+            list: Indices into home_locations, best estimate first
+        """
+        return select_candidates(
+            work_location, gym_location, home_locations,
+            k=k,
+            min_rating=min_rating,
+            max_distance_km=max_distance_km,
+            detour_factor=detour_factor,
+            max_scale=max_scale
+        )
+    
+    def _geocode_params(self, address):
+        return {
+            'address': address,
+            'api_key': self.api_key
+        }
+    
+    def _matrix_params(self, origins, destinations, vehicle):
+        # Format origins and destinations as "lat,lng" strings
+        return {
+            'origins': '|'.join([f"{lat},{lng}" for lat, lng in origins]),
+            'destinations': '|'.join([f"{lat},{lng}" for lat, lng in destinations]),
+            'vehicle': vehicle,
+            'api_key': self.api_key
+        }
+    
+    def _get_cached_route(self, origin, destination, vehicle):
+        if self.route_cache is None:
+            return None
+        return self.route_cache.get(origin, destination, vehicle)
+    
+    def _set_cached_route(self, origin, destination, vehicle, route):
+        if self.route_cache is not None and route is not None:
+            self.route_cache.set(origin, destination, vehicle, route)
+    
+    def _set_cached_routes(self, routes, vehicle):
+        if self.route_cache is not None:
+            self.route_cache.set_many({pair: route for pair, route in routes.items() if route is not None}, vehicle)
   
     def get_location_n_time(self, work_location, home_location, gym_location):
         addressed = [work_location, home_location, gym_location]
@@ -218,18 +312,114 @@ class RouteCalculator:
             )
             
             if distances and times:
-                dis_workhome = distances['1->2']
-                time_workhome = times['1->2']
-                
-                dis_homegym = distances['2->3']
-                time_homegym = times['2->3']
-                
-                dis_workgym = distances['1->3']
-                time_workgym = times['1->3']
-                
-                return dis_workhome, time_workhome, dis_homegym, time_homegym, dis_workgym, time_workgym
+                return unpack_distances_and_times(distances, times)
+        
+        return None
+
+def parse_geocode_response(data, address):
+    """
+    Convert a geocode response to a location dict.
+    
+    Args:
+        data (dict): Geocode response
+        address (str): Address that was geocoded
+        
+    Returns:
+        dict: {'address': str, 'lat': float, 'lng': float}, or None if not found
+    """
+    if data.get('status') == 'OK' and data.get('results'):
+        result = data['results'][0]
+        location = result['geometry']['location']
+        
+        return {
+            'address': result.get('formatted_address', address),
+            'lat': location['lat'],
+            'lng': location['lng']
+        }
+    
+    return None
+
+def parse_matrix_element(element):
+    """
+    Convert one DistanceMatrix element to a route dict.
+    
+    Args:
+        element (dict): Element from a DistanceMatrix response row
+        
+    Returns:
+        dict: Route information, or None if the element is not OK
+    """
+    if not element or element.get('status') != 'OK':
+        return None
+    
+    distance_meters = element['distance']['value']
+    distance_km = distance_meters / 1000
+    
+    return {
+        'distance': round(distance_km, 2),
+        'distance_text': element['distance']['text'],
+        'duration': element['duration']['text'],
+        'duration_seconds': element['duration']['value']
+    }
+
+def parse_distance_matrix(result):
+    """
+    Convert a DistanceMatrix response to rows of route dicts.
+    
+    Args:
+        result (dict): DistanceMatrix response
         
+    Returns:
+        list: One list per origin with a route dict (or None) per destination,
+              or None if the response is invalid
+    """
+    if not result or 'rows' not in result:
         return None
+    
+    return [
+        [parse_matrix_element(element) for element in row.get('elements', [])]
+        for row in result['rows']
+    ]
+
+def routes_to_distances_and_times(route_1_2, route_2_3, route_1_3):
+    """
+    Build the distances (km) and times (minutes) dicts from 3 route dicts.
+    
+    Returns:
+        tuple: (distances, times) with keys '1->2', '2->3', '1->3'
+    """
+    distances = {
+        '1->2': route_1_2['distance'],
+        '2->3': route_2_3['distance'],
+        '1->3': route_1_3['distance']
+    }
+    
+    times = {
+        '1->2': round(route_1_2['duration_seconds'] / 60, 1),
+        '2->3': round(route_2_3['duration_seconds'] / 60, 1),
+        '1->3': round(route_1_3['duration_seconds'] / 60, 1)
+    }
+    
+    return distances, times
+
+def unpack_distances_and_times(distances, times):
+    """
+    Flatten the distances/times dicts of get_distances_and_times().
+    
+    Returns:
+        tuple: (dis_workhome, time_workhome, dis_homegym, time_homegym,
+                dis_workgym, time_workgym)
+    """
+    dis_workhome = distances['1->2']
+    time_workhome = times['1->2']
+    
+    dis_homegym = distances['2->3']
+    time_homegym = times['2->3']
+    
+    dis_workgym = distances['1->3']
+    time_workgym = times['1->3']
+    
+    return dis_workhome, time_workhome, dis_homegym, time_homegym, dis_workgym, time_workgym
 
 def calculate_points_G_n_T(dis_workhome, time_workhome, dis_homegym, time_homegym, dis_workgym, time_workgym, max_scale=5):
     """
@@ -0,0 +1,229 @@
+"""
+Bản đồ nhiệt điểm G/T trên lưới vị trí nhà trong một khung tọa độ.
+
+Thay vì tính cả lưới N×N, lưới được đánh giá từ thô tới mịn: một lưới thưa
+được tính trước, sau đó chỉ những ô có điểm cao (theo phân vị của các điểm đã
+tính) mới được chia đôi mỗi chiều và tính thêm các điểm mới, lặp lại cho tới
+độ phân giải yêu cầu. Mỗi vòng gom toàn bộ quãng đường công ty -> điểm và
+điểm -> gym vào một lần calculate_routes (ít request DistanceMatrix, hoặc
+routing offline nếu calculator có routing_backend).
+"""
+
+import inspect
+
+import numpy as np
+
+from get_3_point import routes_to_distances_and_times, unpack_distances_and_times
+from scoring import calculate_points_G_n_T_array
+
+# Số khoảng tối thiểu mỗi chiều của lưới thô
+MIN_COARSE_INTERVALS = 6
+
+# Mặc định chỉ chia nhỏ các ô thuộc 25% điểm cao nhất
+DEFAULT_REFINE_QUANTILE = 0.75
+
+
+def lattice_axes(bbox, resolution):
+    """
+    Tọa độ các đường lưới.
+
+    Args:
+        bbox (tuple): (south, west, north, east)
+        resolution (int): Số điểm mỗi chiều
+
+    Returns:
+        tuple: (lats, lngs) dạng np.ndarray
+    """
+    south, west, north, east = bbox
+    return np.linspace(south, north, resolution), np.linspace(west, east, resolution)
+
+
+def coarse_indices(resolution):
+    """Chỉ số của lưới thô: bước lũy thừa của 2, luôn gồm cả hai biên."""
+    intervals = resolution - 1
+    step = 1
+    while intervals // (step * 2) >= MIN_COARSE_INTERVALS:
+        step *= 2
+    return sorted(set(range(0, resolution, step)) | {intervals})
+
+
+def split_cell(cell):
+    """
+    Chia một ô (i0, i1, j0, j1) làm đôi theo mỗi chiều còn chia được.
+
+    Returns:
+        list: Các ô con
+    """
+    i0, i1, j0, j1 = cell
+    i_cuts = [i0, (i0 + i1) // 2, i1] if i1 - i0 > 1 else [i0, i1]
+    j_cuts = [j0, (j0 + j1) // 2, j1] if j1 - j0 > 1 else [j0, j1]
+    return [
+        (a, b, c, d)
+        for a, b in zip(i_cuts, i_cuts[1:])
+        for c, d in zip(j_cuts, j_cuts[1:])
+    ]
+
+
+def cell_corners(cell):
+    i0, i1, j0, j1 = cell
+    return [(i0, j0), (i0, j1), (i1, j0), (i1, j1)]
+
+
+async def build_heatmap(calculator, work, gym, bbox, resolution=50, max_scale=5,
+                        vehicle='bike', refine_quantile=DEFAULT_REFINE_QUANTILE):
+    """
+    Tính điểm trên lưới vị trí nhà với chia nhỏ thích ứng.
+
+    Args:
+        calculator: RouteCalculator hoặc AsyncRouteCalculator
+        work, gym (dict): Vị trí đã geocode {'lat', 'lng', ...}
+        bbox (tuple): (south, west, north, east)
+        resolution (int): Số điểm mỗi chiều của lưới mịn nhất
+        max_scale (int): Thang điểm tối đa
+        vehicle (str): Loại xe
+        refine_quantile (float): Ô có điểm góc cao nhất >= phân vị này (trong
+            các điểm đã tính) sẽ được chia nhỏ; 0 = tính cả lưới
+
+    Returns:
+        dict: {'bbox', 'resolution', 'lats', 'lngs', 'points'} với points là
+              {(i, j): {'rating', 'G', 'T', 'step'}}, hoặc None nếu không có
+              đường công ty -> gym
+    """
+    lats, lngs = lattice_axes(bbox, resolution)
+    coord_work = (work['lat'], work['lng'])
+    coord_gym = (gym['lat'], gym['lng'])
+
+    routes = await _calculate_routes(calculator, [(coord_work, coord_gym)], vehicle)
+    route_workgym = routes[(coord_work, coord_gym)]
+    if not route_workgym:
+        return None
+
+    points = {}
+    axis = coarse_indices(resolution)
+    cells = [(a, b, c, d) for a, b in zip(axis, axis[1:]) for c, d in zip(axis, axis[1:])]
+    pending = [(i, j) for i in axis for j in axis]
+    step = axis[1] - axis[0] if len(axis) > 1 else 1
+
+    while pending:
+        await _evaluate_points(
+            calculator, pending, lats, lngs, coord_work, coord_gym,
+            route_workgym, vehicle, max_scale, step, points
+        )
+
+        cells = [cell for cell in cells if cell[1] - cell[0] > 1 or cell[3] - cell[2] > 1]
+        if not cells:
+            break
+
+        ratings = np.array([p['rating'] for p in points.values()], dtype=float)
+        ratings = ratings[~np.isnan(ratings)]
+        if ratings.size == 0:
+            break
+        threshold = np.quantile(ratings, refine_quantile)
+
+        refined = []
+        for cell in cells:
+            corners = np.array([points[c]['rating'] for c in cell_corners(cell)], dtype=float)
+            if np.any(corners >= threshold):
+                refined += split_cell(cell)
+
+        cells = refined
+        step = max(1, step // 2)
+        pending = sorted({
+            corner for cell in cells for corner in cell_corners(cell) if corner not in points
+        })
+
+    return {
+        'bbox': list(bbox),
+        'resolution': resolution,
+        'lats': lats,
+        'lngs': lngs,
+        'points': points
+    }
+
+
+async def _calculate_routes(calculator, pairs, vehicle):
+    routes = calculator.calculate_routes(pairs, vehicle)
+    if inspect.isawaitable(routes):
+        routes = await routes
+    return routes
+
+
+async def _evaluate_points(calculator, indices, lats, lngs, coord_work, coord_gym,
+                           route_workgym, vehicle, max_scale, step, points):
+    """Tính điểm cho các nút lưới mới trong một lần calculate_routes."""
+    coords = [(float(lats[i]), float(lngs[j])) for i, j in indices]
+
+    pairs = []
+    for coord in coords:
+        pairs += [(coord_work, coord), (coord, coord_gym)]
+    routes = await _calculate_routes(calculator, pairs, vehicle)
+
+    legs = []
+    for coord in coords:
+        route_workhome = routes.get((coord_work, coord))
+        route_homegym = routes.get((coord, coord_gym))
+        if route_workhome and route_homegym:
+            distances, times = routes_to_distances_and_times(
+                route_workhome, route_homegym, route_workgym
+            )
+            legs.append(unpack_distances_and_times(distances, times))
+        else:
+            legs.append((np.nan,) * 6)
+
+    columns = np.array(legs, dtype=float).reshape(-1, 6).T
+    rating, G, T, _, _ = calculate_points_G_n_T_array(*columns, max_scale=max_scale, clip=False)
+
+    for n, index in enumerate(indices):
+        points[index] = {
+            'rating': float(rating[n]),
+            'G': float(G[n]),
+            'T': float(T[n]),
+            'step': step
+        }
+
+
+def _round(value):
+    return None if np.isnan(value) else round(value, 2)
+
+
+def to_geojson(heatmap):
+    """
+    GeoJSON FeatureCollection, mỗi điểm đã tính là một Point.
+
+    `step` là khoảng cách (số bước lưới mịn) tới điểm lân cận đã tính: điểm ở
+    vùng điểm thấp có step lớn và đại diện cho một ô rộng hơn.
+    """
+    lats, lngs = heatmap['lats'], heatmap['lngs']
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [round(float(lngs[j]), 6), round(float(lats[i]), 6)]},
+            'properties': {
+                'rating': _round(point['rating']),
+                'G': _round(point['G']),
+                'T': _round(point['T']),
+                'step': point['step']
+            }
+        }
+        for (i, j), point in sorted(heatmap['points'].items())
+    ]
+    return {'type': 'FeatureCollection', 'bbox': heatmap['bbox'], 'features': features}
+
+
+def to_grid(heatmap):
+    """
+    Dạng mảng: rating[i][j] tại (lats[i], lngs[j]), null với nút chưa tính
+    hoặc không có đường.
+    """
+    resolution = heatmap['resolution']
+    rating = [[None] * resolution for _ in range(resolution)]
+    for (i, j), point in heatmap['points'].items():
+        rating[i][j] = _round(point['rating'])
+
+    return {
+        'bbox': heatmap['bbox'],
+        'lats': [round(float(v), 6) for v in heatmap['lats']],
+        'lngs': [round(float(v), 6) for v in heatmap['lngs']],
+        'rating': rating,
+        'evaluated': len(heatmap['points'])
+    }
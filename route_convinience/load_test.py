@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Load test cho Route API: gửi request tới /evaluate hoặc /evaluate/batch với số
+request đồng thời cố định, báo cáo throughput và độ trễ p50/p95/p99.
+
+Chạy offline cùng mock Goong:
+    python mock_goong_server.py --port 8600 --latency-ms 100 --jitter-ms 30
+    GOONG_BASE_URL=http://127.0.0.1:8600 GOONG_API_KEY=mock python api.py
+    python load_test.py --endpoint evaluate --concurrency 32 --requests 2000 \\
+        --mock-url http://127.0.0.1:8600 --save results.json
+
+So sánh với một lần chạy trước (exit code 1 nếu chậm hơn quá --tolerance):
+    python load_test.py ... --baseline results.json --tolerance 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'hanoi_geocode.json')
+
+
+def percentile(sorted_values, p):
+    """Phân vị theo nearest-rank trên danh sách đã sắp xếp."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def load_addresses():
+    with open(FIXTURES_PATH, encoding='utf-8') as f:
+        return list(json.load(f))
+
+
+def make_request(endpoint, index, addresses, args, rng):
+    """
+    Tạo request thứ `index`.
+
+    Với --distinct, mỗi request dùng địa chỉ nhà riêng (mock sẽ gán tọa độ riêng)
+    để đo đường đi không trúng response cache.
+
+    Returns:
+        tuple: (path, kwargs cho httpx)
+    """
+    work, gym = rng.sample(addresses, 2)
+
+    def home(n):
+        if args.distinct:
+            return f"Số {index * args.homes + n} ngõ {rng.randint(1, 300)}, Hà Nội"
+        return rng.choice(addresses)
+
+    if endpoint == 'evaluate':
+        data = {'work_address': work, 'home_address': home(0), 'gym_address': gym}
+        if args.api_key:
+            data['api_key'] = args.api_key
+        return '/evaluate', {'data': data}
+
+    payload = {
+        'work_address': work,
+        'gym_address': gym,
+        'home_addresses': [home(n) for n in range(args.homes)],
+    }
+    if args.api_key:
+        payload['api_key'] = args.api_key
+    if args.top_k:
+        payload['top_k'] = args.top_k
+    return '/evaluate/batch', {'json': payload}
+
+
+async def fetch_mock_stats(client, mock_url):
+    if not mock_url:
+        return None
+    try:
+        response = await client.get(f"{mock_url.rstrip('/')}/_stats")
+        response.raise_for_status()
+        return Counter(response.json())
+    except httpx.HTTPError as e:
+        print(f"⚠️  Không đọc được thống kê mock: {e}")
+        return None
+
+
+async def run(args):
+    """
+    Chạy load test.
+
+    Returns:
+        dict: Kết quả (throughput, phân vị độ trễ, lỗi, số lần gọi Goong)
+    """
+    rng = random.Random(args.seed)
+    addresses = load_addresses()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        for i in range(args.warmup):
+            path, kwargs = make_request(args.endpoint, -1 - i, addresses, args, rng)
+            await client.post(path, **kwargs)
+
+        before = await fetch_mock_stats(client, args.mock_url)
+
+        queue = asyncio.Queue()
+        for i in range(args.requests):
+            queue.put_nowait(make_request(args.endpoint, i, addresses, args, rng))
+
+        latencies = []
+        statuses = Counter()
+
+        async def worker():
+            while True:
+                try:
+                    path, kwargs = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, **kwargs)
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        after = await fetch_mock_stats(client, args.mock_url)
+
+    latencies.sort()
+    ok = statuses.get(200, 0)
+    result = {
+        'endpoint': args.endpoint,
+        'concurrency': args.concurrency,
+        'requests': args.requests,
+        'homes': args.homes if args.endpoint == 'batch' else 1,
+        'distinct': args.distinct,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(args.requests / elapsed, 2) if elapsed else 0.0,
+        'ok': ok,
+        'errors': {str(k): v for k, v in statuses.items() if k != 200},
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(latencies[-1], 2) if latencies else 0.0,
+        },
+    }
+    if before is not None and after is not None:
+        upstream = after - before
+        result['upstream_calls'] = dict(upstream)
+        result['upstream_calls_per_request'] = round(
+            (upstream['geocode'] + upstream['distance_matrix']) / args.requests, 3
+        )
+    return result
+
+
+def print_report(result):
+    latency = result['latency_ms']
+    print("=" * 70)
+    print(f"LOAD TEST: {result['endpoint']} × {result['requests']} "
+          f"(concurrency {result['concurrency']}, homes/request {result['homes']})")
+    print("=" * 70)
+    print(f"⏱️  Thời gian:   {result['elapsed_s']} s")
+    print(f"🚀 Throughput:  {result['throughput_rps']} req/s")
+    print(f"📊 Độ trễ (ms): p50 {latency['p50']} | p95 {latency['p95']} | "
+          f"p99 {latency['p99']} | max {latency['max']}")
+    print(f"✅ Thành công:  {result['ok']}/{result['requests']}")
+    if result['errors']:
+        print(f"❌ Lỗi:         {result['errors']}")
+    if 'upstream_calls' in result:
+        print(f"🌐 Gọi Goong:   {result['upstream_calls']} "
+              f"({result['upstream_calls_per_request']} lần/request)")
+
+
+def compare_with_baseline(result, baseline, tolerance):
+    """
+    So sánh với lần chạy trước.
+
+    Returns:
+        list: Các chỉ số bị chậm đi quá tolerance (rỗng nếu đạt)
+    """
+    regressions = []
+    for name in ('p50', 'p95', 'p99'):
+        old, new = baseline['latency_ms'][name], result['latency_ms'][name]
+        if old and new > old * (1 + tolerance):
+            regressions.append(f"{name}: {old} -> {new} ms")
+
+    old, new = baseline['throughput_rps'], result['throughput_rps']
+    if old and new < old * (1 - tolerance):
+        regressions.append(f"throughput: {old} -> {new} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Route API')
+    parser.add_argument('--url', default=os.getenv('ROUTE_API_URL', 'http://127.0.0.1:8452'))
+    parser.add_argument('--endpoint', choices=['evaluate', 'batch'], default='evaluate')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--homes', type=int, default=20, help='Số nhà mỗi request batch')
+    parser.add_argument('--top-k', type=int, default=None)
+    parser.add_argument('--distinct', action='store_true',
+                        help='Mỗi request một địa chỉ nhà mới (không trúng response cache)')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--api-key', default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mock-url', default=None, help='URL mock Goong để đếm số lần gọi upstream')
+    parser.add_argument('--save', default=None, help='Ghi kết quả ra file JSON')
+    parser.add_argument('--baseline', default=None, help='File JSON kết quả cũ để so sánh')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"💾 Đã lưu kết quả vào {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print("🐢 Chậm hơn baseline:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print(f"👍 Không chậm hơn baseline quá {args.tolerance:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""
+Routing offline trên đồ thị đường bộ cục bộ, dùng thay Goong DistanceMatrix.
+
+Đồ thị được tiền xử lý từ bản trích OSM (xem build_road_graph.py) thành file
+.npz dạng CSR gọn:
+    node_lat, node_lng   tọa độ các nút
+    indptr, indices      danh sách cạnh đi ra của từng nút
+    length_m             chiều dài cạnh (mét)
+    road_class           loại đường của cạnh (xem ROAD_CLASSES)
+
+Thời gian đi được tính theo tốc độ của từng loại xe trên từng loại đường, đường
+ngắn nhất (theo thời gian) tìm bằng Dijkstra hai chiều.
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+from prefilter import haversine_km
+
+# Loại đường (chỉ số dùng trong road_class)
+ROAD_CLASSES = ['motorway', 'trunk', 'primary', 'secondary', 'tertiary', 'residential', 'service']
+
+# Tốc độ trung bình trong đô thị (km/h) theo loại xe và loại đường, 0 = cấm đi
+VEHICLE_SPEEDS = {
+    'car':   [80, 60, 40, 35, 30, 20, 10],
+    'taxi':  [80, 60, 40, 35, 30, 20, 10],
+    'bike':  [0, 45, 35, 30, 28, 22, 12],
+    'truck': [60, 45, 35, 30, 25, 15, 10],
+    'hd':    [60, 45, 35, 30, 25, 15, 10],
+}
+
+# Kích thước ô lưới dùng để tìm nút gần nhất (độ)
+GRID_CELL_DEG = 0.005
+
+
+class RoadGraph:
+    """
+    Đồ thị đường bộ dạng CSR, trả lời truy vấn khoảng cách/thời gian ngắn nhất.
+    """
+
+    def __init__(self, node_lat, node_lng, indptr, indices, length_m, road_class,
+                 speeds=VEHICLE_SPEEDS):
+        """
+        Args:
+            node_lat, node_lng: Mảng tọa độ các nút
+            indptr, indices: Danh sách kề dạng CSR (cạnh đi ra)
+            length_m: Chiều dài từng cạnh (mét)
+            road_class: Loại đường từng cạnh (chỉ số trong ROAD_CLASSES)
+            speeds (dict): Tốc độ (km/h) theo loại xe và loại đường
+        """
+        self.node_lat = np.asarray(node_lat, dtype=float)
+        self.node_lng = np.asarray(node_lng, dtype=float)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.length_m = np.asarray(length_m, dtype=float)
+        self.road_class = np.asarray(road_class, dtype=np.int64)
+        self.speeds = speeds
+
+        # Đồ thị ngược (cạnh đi vào) cho chiều tìm kiếm từ đích
+        sources = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        self._reverse_edges = np.argsort(self.indices, kind='stable')
+        self.rev_indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(self.indices, minlength=len(self.indptr) - 1)))
+        )
+        self.rev_indices = sources[self._reverse_edges]
+
+        self._profiles = {}
+        self._build_grid()
+
+    @classmethod
+    def load(cls, path, speeds=VEHICLE_SPEEDS):
+        """
+        Đọc đồ thị từ file .npz.
+
+        Args:
+            path (str): Đường dẫn file do build_road_graph.py tạo ra
+
+        Returns:
+            RoadGraph
+        """
+        data = np.load(path)
+        return cls(
+            data['node_lat'], data['node_lng'], data['indptr'], data['indices'],
+            data['length_m'], data['road_class'], speeds=speeds
+        )
+
+    def _build_grid(self):
+        cells = {}
+        rows = np.floor(self.node_lat / GRID_CELL_DEG).astype(np.int64)
+        cols = np.floor(self.node_lng / GRID_CELL_DEG).astype(np.int64)
+        for node, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            cells.setdefault(cell, []).append(node)
+        self._grid = {cell: np.array(nodes) for cell, nodes in cells.items()}
+
+    def nearest_node(self, lat, lng, max_distance_m=1000):
+        """
+        Tìm nút gần tọa độ nhất.
+
+        Args:
+            lat, lng (float): Tọa độ
+            max_distance_m (float): Khoảng cách tối đa cho phép (mét)
+
+        Returns:
+            int: Chỉ số nút, hoặc None nếu không có nút nào đủ gần
+        """
+        row = math.floor(lat / GRID_CELL_DEG)
+        col = math.floor(lng / GRID_CELL_DEG)
+        max_ring = int(max_distance_m / 111000 / GRID_CELL_DEG) + 1
+
+        best_node, best_distance, found_ring = None, math.inf, None
+        for ring in range(max_ring + 1):
+            # Quét thêm một vòng sau vòng đầu tiên tìm thấy để không bỏ sót nút gần hơn
+            if found_ring is not None and ring > found_ring + 1:
+                break
+
+            nodes = [
+                self._grid[(row + i, col + j)]
+                for i in range(-ring, ring + 1)
+                for j in range(-ring, ring + 1)
+                if max(abs(i), abs(j)) == ring and (row + i, col + j) in self._grid
+            ]
+            if not nodes:
+                continue
+
+            nodes = np.concatenate(nodes)
+            distances = haversine_km(lat, lng, self.node_lat[nodes], self.node_lng[nodes]) * 1000
+            i = int(np.argmin(distances))
+            if distances[i] < best_distance:
+                best_node, best_distance = int(nodes[i]), float(distances[i])
+                if found_ring is None:
+                    found_ring = ring
+
+        if best_node is None or best_distance > max_distance_m:
+            return None
+        return best_node
+
+    def _profile(self, vehicle):
+        """Trọng số (giây) của cạnh xuôi/ngược cho một loại xe, dạng list để duyệt nhanh."""
+        if vehicle not in self._profiles:
+            speeds_kmh = np.asarray(self.speeds.get(vehicle, self.speeds['car']), dtype=float)
+            speed_ms = speeds_kmh[self.road_class] / 3.6
+            with np.errstate(divide='ignore'):
+                seconds = np.where(speed_ms > 0, self.length_m / speed_ms, np.inf)
+
+            self._profiles[vehicle] = (
+                (self.indptr.tolist(), self.indices.tolist(), seconds.tolist(), self.length_m.tolist()),
+                (self.rev_indptr.tolist(), self.rev_indices.tolist(),
+                 seconds[self._reverse_edges].tolist(), self.length_m[self._reverse_edges].tolist()),
+            )
+        return self._profiles[vehicle]
+
+    def shortest_path(self, source, target, vehicle='car'):
+        """
+        Đường nhanh nhất giữa hai nút bằng Dijkstra hai chiều.
+
+        Args:
+            source, target (int): Chỉ số nút
+            vehicle (str): Loại xe
+
+        Returns:
+            tuple: (distance_m, duration_s), hoặc None nếu không có đường
+        """
+        if source == target:
+            return 0.0, 0.0
+
+        graphs = self._profile(vehicle)
+        dist = ({source: 0.0}, {target: 0.0})
+        length = ({source: 0.0}, {target: 0.0})
+        heaps = ([(0.0, source)], [(0.0, target)])
+        settled = (set(), set())
+        best, best_length = math.inf, math.inf
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+
+            indptr, indices, weights, lengths = graphs[side]
+            own_dist, own_length = dist[side], length[side]
+            other_dist, other_length = dist[1 - side], length[1 - side]
+
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                nd = d + weights[e]
+                if nd == math.inf:
+                    continue
+
+                if nd < own_dist.get(v, math.inf):
+                    own_dist[v] = nd
+                    own_length[v] = own_length[u] + lengths[e]
+                    heapq.heappush(heaps[side], (nd, v))
+
+                if v in other_dist and nd + other_dist[v] < best:
+                    best = nd + other_dist[v]
+                    best_length = own_length[u] + lengths[e] + other_length[v]
+
+        if best == math.inf:
+            return None
+        return best_length, best
+
+    def shortest_paths_from(self, source, targets, vehicle='car'):
+        """
+        Đường nhanh nhất từ một nút tới nhiều nút (Dijkstra một chiều, dừng khi
+        đã tới hết các đích).
+
+        Returns:
+            dict: {target: (distance_m, duration_s)} cho các đích tới được
+        """
+        (indptr, indices, weights, lengths), _ = self._profile(vehicle)
+        remaining = set(targets)
+        dist = {source: 0.0}
+        length = {source: 0.0}
+        heap = [(0.0, source)]
+        settled = set()
+        results = {}
+
+        while heap and remaining:
+            d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+
+            if u in remaining:
+                results[u] = (length[u], d)
+                remaining.discard(u)
+
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                nd = d + weights[e]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    length[v] = length[u] + lengths[e]
+                    heapq.heappush(heap, (nd, v))
+
+        return results
+
+
+class LocalRoutingBackend:
+    """
+    Backend routing cho RouteCalculator, trả về route dict cùng dạng với Goong.
+    """
+
+    def __init__(self, graph, max_snap_distance_m=1000):
+        """
+        Args:
+            graph (RoadGraph): Đồ thị đường bộ
+            max_snap_distance_m (float): Khoảng cách tối đa từ tọa độ tới nút gần nhất
+        """
+        self.graph = graph
+        self.max_snap_distance_m = max_snap_distance_m
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(RoadGraph.load(path), **kwargs)
+
+    def route_pairs(self, pairs, vehicle='car'):
+        """
+        Tính route cho nhiều cặp tọa độ.
+
+        Các cặp chung origin được tính bằng một lần Dijkstra tới nhiều đích,
+        cặp lẻ dùng Dijkstra hai chiều.
+
+        Args:
+            pairs (list): Danh sách (origin, destination), mỗi điểm là (lat, lng)
+            vehicle (str): Loại xe
+
+        Returns:
+            dict: {(origin, destination): route dict hoặc None}
+        """
+        snapped = {}
+        for origin, destination in pairs:
+            for point in (origin, destination):
+                if point not in snapped:
+                    snapped[point] = self.graph.nearest_node(
+                        point[0], point[1], self.max_snap_distance_m
+                    )
+
+        destinations_by_origin = {}
+        for origin, destination in pairs:
+            destinations_by_origin.setdefault(origin, []).append(destination)
+
+        results = {}
+        for origin, destinations in destinations_by_origin.items():
+            source = snapped[origin]
+            targets = [snapped[destination] for destination in destinations]
+
+            if source is None:
+                paths = {}
+            elif len(targets) == 1 and targets[0] is not None:
+                path = self.graph.shortest_path(source, targets[0], vehicle)
+                paths = {targets[0]: path} if path else {}
+            else:
+                paths = self.graph.shortest_paths_from(
+                    source, [t for t in targets if t is not None], vehicle
+                )
+
+            for destination, target in zip(destinations, targets):
+                path = paths.get(target)
+                results[(origin, destination)] = _route_dict(*path) if path else None
+
+        return results
+
+
+def _route_dict(distance_m, duration_s):
+    distance_km = distance_m / 1000
+    minutes = max(1, round(duration_s / 60))
+    return {
+        'distance': round(distance_km, 2),
+        'distance_text': f"{distance_km:.1f} km",
+        'duration': f"{minutes} phút",
+        'duration_seconds': int(round(duration_s))
+    }
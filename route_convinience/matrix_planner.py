@@ -0,0 +1,200 @@
+"""
+Gom các cặp (origin, destination) thành ít request DistanceMatrix nhất có thể.
+
+Goong DistanceMatrix nhận nhiều origins và destinations trong một lần gọi,
+nên thay vì gọi 1x1 cho từng cặp, planner thu thập toàn bộ các cặp cần tính,
+loại trùng, đóng gói vào các request vừa giới hạn của API rồi trả kết quả
+về đúng từng cặp.
+"""
+
+import asyncio
+
+# Giới hạn kích thước một request DistanceMatrix
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+MAX_ELEMENTS = 100
+
+
+class MatrixPlanner:
+    """
+    Lập kế hoạch các request DistanceMatrix cho một tập cặp tọa độ.
+
+    Ví dụ với 3 địa điểm (1->2, 2->3, 1->3) chỉ cần một request:
+    origins=[1, 2], destinations=[2, 3].
+    """
+
+    def __init__(self, max_origins=MAX_ORIGINS, max_destinations=MAX_DESTINATIONS,
+                 max_elements=MAX_ELEMENTS):
+        """
+        Args:
+            max_origins (int): Số origins tối đa trong một request
+            max_destinations (int): Số destinations tối đa trong một request
+            max_elements (int): Số phần tử (origins x destinations) tối đa
+        """
+        self.max_origins = max_origins
+        self.max_destinations = max_destinations
+        self.max_elements = max_elements
+        self.pairs = []
+        self._seen = set()
+
+    def add(self, origin, destination):
+        """
+        Thêm một cặp cần tính. Cặp trùng lặp chỉ được tính một lần.
+
+        Args:
+            origin: Tuple (lat, lng)
+            destination: Tuple (lat, lng)
+        """
+        pair = (tuple(origin), tuple(destination))
+        if pair not in self._seen:
+            self._seen.add(pair)
+            self.pairs.append(pair)
+
+    def add_many(self, pairs):
+        """Thêm nhiều cặp (origin, destination)."""
+        for origin, destination in pairs:
+            self.add(origin, destination)
+
+    def plan(self):
+        """
+        Đóng gói các cặp vào ít request nhất trong giới hạn của API.
+
+        Mỗi origin (cùng các destination nó cần, chia nhỏ nếu vượt giới hạn) là
+        một phần tử; các phần tử được xếp lần lượt (lớn trước) vào request hiện
+        có làm tăng ít ô (origins x destinations) nhất mà vẫn vừa giới hạn, không
+        vừa request nào thì mở request mới. Các origin có tập destination khác
+        nhau vẫn được gom chung khi còn chỗ.
+
+        Returns:
+            list: Danh sách tuple (origins, destinations), mỗi tuple là một request
+        """
+        if not self.pairs:
+            return []
+
+        # Tập destination cần cho từng origin (giữ thứ tự thêm vào)
+        destinations_by_origin = {}
+        for origin, destination in self.pairs:
+            destinations_by_origin.setdefault(origin, []).append(destination)
+
+        # Nếu toàn bộ vừa một request thì không cần chia
+        all_origins = list(destinations_by_origin)
+        all_destinations = _unique([d for _, d in self.pairs])
+        if self._fits(len(all_origins), len(all_destinations)):
+            return [(all_origins, all_destinations)]
+
+        dest_chunk_size = min(self.max_destinations, self.max_elements)
+        items = [
+            (origin, destinations[start:start + dest_chunk_size])
+            for origin, destinations in destinations_by_origin.items()
+            for start in range(0, len(destinations), dest_chunk_size)
+        ]
+        # First-fit decreasing: phần tử nhiều destination xếp trước (sort ổn định)
+        items.sort(key=lambda item: -len(item[1]))
+
+        batches = []  # mỗi request: (origins, destinations), kèm set để tra nhanh
+        for origin, chunk in items:
+            best, best_growth = None, None
+            for batch in batches:
+                origins, destinations, origin_set, destination_set = batch
+                n_origins = len(origins) + (origin not in origin_set)
+                n_destinations = len(destinations) + sum(1 for d in chunk if d not in destination_set)
+                if not self._fits(n_origins, n_destinations):
+                    continue
+                growth = n_origins * n_destinations - len(origins) * len(destinations)
+                # Ít ô tăng thêm nhất; bằng nhau thì chọn request đầy hơn để xếp khít
+                if best is None or (growth, -len(origins) * len(destinations)) < best_growth:
+                    best = batch
+                    best_growth = (growth, -len(origins) * len(destinations))
+
+            if best is None:
+                best = ([], [], set(), set())
+                batches.append(best)
+
+            origins, destinations, origin_set, destination_set = best
+            if origin not in origin_set:
+                origin_set.add(origin)
+                origins.append(origin)
+            for destination in chunk:
+                if destination not in destination_set:
+                    destination_set.add(destination)
+                    destinations.append(destination)
+
+        return [(origins, destinations) for origins, destinations, _, _ in batches]
+
+    def _fits(self, n_origins, n_destinations):
+        return (n_origins <= self.max_origins
+                and n_destinations <= self.max_destinations
+                and n_origins * n_destinations <= self.max_elements)
+
+    def execute(self, fetch_matrix):
+        """
+        Thực thi kế hoạch và trả kết quả về từng cặp.
+
+        Args:
+            fetch_matrix (callable): Hàm (origins, destinations) -> list các hàng,
+                mỗi hàng là list kết quả (dict route hoặc None) theo destinations
+
+        Returns:
+            dict: {(origin, destination): route dict hoặc None}
+        """
+        results = {}
+        for origins, destinations in self.plan():
+            rows = fetch_matrix(origins, destinations)
+            results.update(self.scatter(origins, destinations, rows))
+
+        return {pair: results.get(pair) for pair in self.pairs}
+
+    async def execute_async(self, fetch_matrix):
+        """
+        Như execute() nhưng gửi đồng thời tất cả các request.
+
+        Args:
+            fetch_matrix (callable): Coroutine (origins, destinations) -> list các hàng
+
+        Returns:
+            dict: {(origin, destination): route dict hoặc None}
+        """
+        batches = self.plan()
+        all_rows = await asyncio.gather(
+            *(fetch_matrix(origins, destinations) for origins, destinations in batches)
+        )
+
+        results = {}
+        for (origins, destinations), rows in zip(batches, all_rows):
+            results.update(self.scatter(origins, destinations, rows))
+
+        return {pair: results.get(pair) for pair in self.pairs}
+
+    def scatter(self, origins, destinations, rows):
+        """
+        Trải kết quả của một request về các cặp được yêu cầu.
+
+        Args:
+            origins (list): Origins của request
+            destinations (list): Destinations của request
+            rows (list): Kết quả dạng ma trận, None nếu request lỗi
+
+        Returns:
+            dict: {(origin, destination): route dict hoặc None}
+        """
+        results = {}
+        for i, origin in enumerate(origins):
+            for j, destination in enumerate(destinations):
+                pair = (origin, destination)
+                if pair not in self._seen:
+                    continue
+                try:
+                    results[pair] = rows[i][j]
+                except (TypeError, IndexError):
+                    results[pair] = None
+        return results
+
+
+def _unique(items):
+    seen = set()
+    result = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            result.append(item)
+    return result
@@ -0,0 +1,127 @@
+"""
+Metrics dạng Prometheus cho Route API và các lần gọi Goong.
+
+Xuất tại GET /metrics:
+    route_api_request_duration_seconds   thời gian xử lý request theo endpoint
+    goong_upstream_calls_total           số lần gọi Goong theo loại, kết quả, API key
+    goong_upstream_latency_seconds       độ trễ gọi Goong theo loại (geocode/distance_matrix)
+    goong_scheduler_wait_seconds         thời gian chờ quota theo độ ưu tiên
+    goong_scheduler_merged_total         số request DistanceMatrix được gộp vào request khác
+    route_cache_*                        hit/miss/hit ratio của các cache (kể cả hit từ file chung)
+
+API key không bao giờ được ghi nguyên văn, chỉ dùng 8 ký tự đầu của SHA-256.
+"""
+
+import hashlib
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+REGISTRY = CollectorRegistry()
+
+REQUEST_DURATION = Histogram(
+    'route_api_request_duration_seconds',
+    'Time spent handling API requests',
+    ['endpoint', 'method', 'status'],
+    registry=REGISTRY
+)
+
+UPSTREAM_CALLS = Counter(
+    'goong_upstream_calls_total',
+    'Calls made to the Goong API',
+    ['kind', 'outcome', 'api_key'],
+    registry=REGISTRY
+)
+
+UPSTREAM_LATENCY = Histogram(
+    'goong_upstream_latency_seconds',
+    'Latency of calls to the Goong API',
+    ['kind'],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2.5, 5, 10),
+    registry=REGISTRY
+)
+
+SCHEDULER_WAIT = Histogram(
+    'goong_scheduler_wait_seconds',
+    'Time Goong calls spent queued for quota',
+    ['priority'],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    registry=REGISTRY
+)
+
+SCHEDULER_MERGED = Counter(
+    'goong_scheduler_merged_total',
+    'DistanceMatrix requests merged into another queued request',
+    registry=REGISTRY
+)
+
+
+def key_label(api_key):
+    """Nhãn ẩn danh cho API key."""
+    return hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:8]
+
+
+@contextmanager
+def observe_upstream(kind, api_key):
+    """
+    Đo một lần gọi Goong.
+
+    Args:
+        kind (str): 'geocode' hoặc 'distance_matrix'
+        api_key (str): API key dùng cho lần gọi
+    """
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        UPSTREAM_LATENCY.labels(kind).observe(time.perf_counter() - start)
+        UPSTREAM_CALLS.labels(kind, outcome, key_label(api_key)).inc()
+
+
+class CacheStatsCollector:
+    """
+    Đọc stats() của các cache mỗi lần Prometheus scrape.
+    """
+
+    def __init__(self, caches):
+        """
+        Args:
+            caches (dict): {tên cache: đối tượng có stats()}
+        """
+        self.caches = caches
+
+    def collect(self):
+        hits = GaugeMetricFamily('route_cache_hits', 'Cache hits', labels=['cache'])
+        misses = GaugeMetricFamily('route_cache_misses', 'Cache misses', labels=['cache'])
+        ratio = GaugeMetricFamily('route_cache_hit_ratio', 'Cache hit ratio', labels=['cache'])
+        size = GaugeMetricFamily('route_cache_size', 'Entries held in memory', labels=['cache'])
+        shared = GaugeMetricFamily('route_cache_shared_hits', 'Hits served from the cross-worker SQLite file',
+                                   labels=['cache'])
+
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            hits.add_metric([name], stats['hits'])
+            misses.add_metric([name], stats['misses'])
+            ratio.add_metric([name], stats['hit_ratio'])
+            size.add_metric([name], stats['size'])
+            if 'shared_hits' in stats:
+                shared.add_metric([name], stats['shared_hits'])
+
+        return [hits, misses, ratio, size, shared]
+
+
+def register_caches(caches):
+    """Đăng ký các cache để xuất hit/miss ra /metrics."""
+    REGISTRY.register(CacheStatsCollector(caches))
+
+
+def render_latest():
+    """
+    Returns:
+        tuple: (nội dung dạng text exposition, content type)
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Mock Goong API (geocode + DistanceMatrix) để benchmark Route API offline.
+
+Địa chỉ có trong fixtures/hanoi_geocode.json trả về tọa độ đã ghi lại, địa chỉ
+khác được gán một tọa độ cố định (theo hash) trong nội thành Hà Nội. Khoảng cách
+DistanceMatrix = đường chim bay × hệ số đường vòng, thời gian theo tốc độ từng
+loại xe, nên kết quả ổn định giữa các lần chạy.
+
+Ví dụ:
+    python mock_goong_server.py --port 8600 --latency-ms 120 --jitter-ms 40 --error-rate 0.01
+    GOONG_BASE_URL=http://127.0.0.1:8600 python api.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+from geocode_cache import normalize_address
+from matrix_planner import MAX_DESTINATIONS, MAX_ELEMENTS, MAX_ORIGINS
+from prefilter import DEFAULT_DETOUR_FACTOR, haversine_km
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'hanoi_geocode.json')
+
+# Khung tọa độ nội thành Hà Nội cho địa chỉ không có trong fixtures
+HANOI_BOUNDS = (20.97, 105.76, 21.07, 105.88)
+
+# Tốc độ trung bình (km/h) theo loại xe
+MOCK_SPEEDS = {'car': 25, 'taxi': 25, 'bike': 22, 'truck': 20, 'hd': 20}
+
+settings = {
+    'latency_ms': float(os.getenv('MOCK_LATENCY_MS', '0')),
+    'jitter_ms': float(os.getenv('MOCK_JITTER_MS', '0')),
+    'error_rate': float(os.getenv('MOCK_ERROR_RATE', '0')),
+    'error_status': int(os.getenv('MOCK_ERROR_STATUS', '500')),
+}
+
+calls = Counter()
+
+app = FastAPI(title="Mock Goong API")
+
+
+def load_fixtures(path=FIXTURES_PATH):
+    """
+    Returns:
+        dict: {địa chỉ đã chuẩn hóa: {'formatted_address', 'lat', 'lng'}}
+    """
+    with open(path, encoding='utf-8') as f:
+        return {normalize_address(address): value for address, value in json.load(f).items()}
+
+
+fixtures = load_fixtures()
+
+
+def synthetic_location(address):
+    """Tọa độ cố định trong HANOI_BOUNDS suy ra từ hash của địa chỉ."""
+    digest = hashlib.sha256(normalize_address(address).encode('utf-8')).digest()
+    south, west, north, east = HANOI_BOUNDS
+    lat = south + (north - south) * int.from_bytes(digest[:4], 'big') / 2 ** 32
+    lng = west + (east - west) * int.from_bytes(digest[4:8], 'big') / 2 ** 32
+    return {'formatted_address': address, 'lat': round(lat, 6), 'lng': round(lng, 6)}
+
+
+def parse_points(value):
+    points = []
+    for part in value.split('|'):
+        lat, lng = part.split(',')
+        points.append((float(lat), float(lng)))
+    return points
+
+
+def matrix_element(origin, destination, vehicle):
+    distance_km = float(haversine_km(origin[0], origin[1], destination[0], destination[1])) * DEFAULT_DETOUR_FACTOR
+    seconds = int(round(distance_km / MOCK_SPEEDS.get(vehicle, MOCK_SPEEDS['car']) * 3600))
+    return {
+        'status': 'OK',
+        'distance': {'text': f"{distance_km:.1f} km", 'value': int(round(distance_km * 1000))},
+        'duration': {'text': f"{max(1, round(seconds / 60))} phút", 'value': seconds}
+    }
+
+
+async def simulate(kind):
+    """
+    Mô phỏng độ trễ và lỗi của Goong.
+
+    Returns:
+        JSONResponse lỗi nếu lần gọi này bị chọn để lỗi, ngược lại None
+    """
+    calls[kind] += 1
+    delay = settings['latency_ms'] + random.uniform(-1, 1) * settings['jitter_ms']
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    if settings['error_rate'] and random.random() < settings['error_rate']:
+        calls[f'{kind}_error'] += 1
+        return JSONResponse(status_code=settings['error_status'], content={'error': 'mock failure'})
+    return None
+
+
+@app.get("/geocode")
+async def geocode(address: str = Query(...), api_key: str = Query(None)):
+    error = await simulate('geocode')
+    if error is not None:
+        return error
+
+    location = fixtures.get(normalize_address(address)) or synthetic_location(address)
+    return {
+        'status': 'OK',
+        'results': [{
+            'formatted_address': location['formatted_address'],
+            'geometry': {'location': {'lat': location['lat'], 'lng': location['lng']}}
+        }]
+    }
+
+
+@app.get("/DistanceMatrix")
+async def distance_matrix(origins: str = Query(...), destinations: str = Query(...),
+                          vehicle: str = Query('car'), api_key: str = Query(None)):
+    error = await simulate('distance_matrix')
+    if error is not None:
+        return error
+
+    try:
+        origin_points = parse_points(origins)
+        destination_points = parse_points(destinations)
+    except ValueError:
+        return JSONResponse(status_code=400, content={'error': 'invalid coordinates'})
+
+    # Giới hạn giống Goong để phát hiện request vượt kích thước
+    if (len(origin_points) > MAX_ORIGINS or len(destination_points) > MAX_DESTINATIONS
+            or len(origin_points) * len(destination_points) > MAX_ELEMENTS):
+        calls['distance_matrix_oversized'] += 1
+        return JSONResponse(status_code=400, content={'error': 'too many elements'})
+
+    calls['elements'] += len(origin_points) * len(destination_points)
+    return {
+        'rows': [
+            {'elements': [matrix_element(o, d, vehicle) for d in destination_points]}
+            for o in origin_points
+        ]
+    }
+
+
+@app.get("/_stats")
+async def stats():
+    """Số lần gọi theo loại, dùng để load_test.py tính số lần gọi Goong mỗi request."""
+    return dict(calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Goong API server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--latency-ms', type=float, default=settings['latency_ms'],
+                        help='Độ trễ trung bình mỗi lần gọi (ms)')
+    parser.add_argument('--jitter-ms', type=float, default=settings['jitter_ms'],
+                        help='Dao động ngẫu nhiên ± quanh độ trễ (ms)')
+    parser.add_argument('--error-rate', type=float, default=settings['error_rate'],
+                        help='Tỉ lệ lần gọi trả lỗi (0-1)')
+    parser.add_argument('--error-status', type=int, default=settings['error_status'],
+                        help='HTTP status của lần gọi lỗi')
+    args = parser.parse_args()
+
+    settings.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status
+    )
+
+    print(f"🧪 Mock Goong tại http://{args.host}:{args.port} "
+          f"(latency {args.latency_ms}±{args.jitter_ms} ms, error rate {args.error_rate})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
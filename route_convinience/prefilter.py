@@ -0,0 +1,89 @@
+"""
+Lọc sơ bộ ứng viên bằng khoảng cách đường chim bay (haversine), không gọi API.
+
+Dùng trước khi gửi DistanceMatrix cho một danh sách nhà lớn: ước lượng điểm G
+từ tọa độ đã geocode và chỉ giữ lại các nhà có triển vọng.
+"""
+
+import numpy as np
+
+from scoring import calculate_points_G_n_T_array, top_k
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Tỷ lệ quãng đường thực tế so với đường chim bay trong đô thị
+DEFAULT_DETOUR_FACTOR = 1.3
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Khoảng cách đường tròn lớn (km), nhận số hoặc mảng NumPy.
+
+    Returns:
+        np.ndarray: Khoảng cách (km)
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def estimate_ratings(work, gym, homes, detour_factor=DEFAULT_DETOUR_FACTOR, max_scale=5):
+    """
+    Ước lượng điểm G cho các nhà từ khoảng cách haversine x hệ số đường vòng.
+
+    Args:
+        work (dict): Tọa độ công ty {'lat', 'lng'}
+        gym (dict): Tọa độ phòng gym {'lat', 'lng'}
+        homes (list): Tọa độ các nhà {'lat', 'lng'}
+        detour_factor (float): Hệ số nhân khoảng cách chim bay ra đường thực tế
+        max_scale: Thang điểm tối đa
+
+    Returns:
+        tuple: (G, dis_workhome, dis_homegym) - mảng điểm G ước lượng và các
+               khoảng cách ước lượng (km)
+    """
+    home_lat = np.array([home['lat'] for home in homes], dtype=float)
+    home_lng = np.array([home['lng'] for home in homes], dtype=float)
+
+    dis_workhome = detour_factor * haversine_km(work['lat'], work['lng'], home_lat, home_lng)
+    dis_homegym = detour_factor * haversine_km(home_lat, home_lng, gym['lat'], gym['lng'])
+    dis_workgym = detour_factor * haversine_km(work['lat'], work['lng'], gym['lat'], gym['lng'])
+
+    # Chỉ dùng khoảng cách: thời gian ước lượng tỷ lệ với khoảng cách nên T ≈ G
+    _, G, _, _, _ = calculate_points_G_n_T_array(
+        dis_workhome, dis_workhome, dis_homegym, dis_homegym, dis_workgym, dis_workgym,
+        max_scale=max_scale, clip=False
+    )
+    return G, dis_workhome, dis_homegym
+
+
+def select_candidates(work, gym, homes, k=None, min_rating=None, max_distance_km=None,
+                      detour_factor=DEFAULT_DETOUR_FACTOR, max_scale=5):
+    """
+    Chọn các nhà đáng gửi sang routing API.
+
+    Args:
+        work, gym (dict): Tọa độ công ty và phòng gym
+        homes (list): Tọa độ các nhà
+        k (int): Giữ tối đa k nhà có điểm ước lượng cao nhất
+        min_rating (float): Bỏ các nhà có điểm ước lượng thấp hơn
+        max_distance_km (float): Bỏ các nhà xa công ty hơn (km, đã nhân hệ số đường vòng)
+        detour_factor (float): Hệ số đường vòng
+        max_scale: Thang điểm tối đa
+
+    Returns:
+        list: Chỉ số các nhà được giữ, theo thứ tự điểm ước lượng giảm dần
+    """
+    if not homes:
+        return []
+
+    G, dis_workhome, _ = estimate_ratings(work, gym, homes, detour_factor, max_scale)
+
+    with np.errstate(invalid='ignore'):
+        if min_rating is not None:
+            G = np.where(G >= min_rating, G, np.nan)
+        if max_distance_km is not None:
+            G = np.where(dis_workhome <= max_distance_km, G, np.nan)
+
+    return top_k(G, len(homes) if k is None else k).tolist()
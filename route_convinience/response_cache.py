@@ -0,0 +1,121 @@
+"""
+Cache response của /evaluate và gộp các request giống nhau đang chạy (single-flight).
+
+Khi một tin đăng được chia sẻ, rất nhiều request với cùng 3 địa chỉ tới gần như
+cùng lúc. Request đầu tiên chạy chuỗi geocode + route, các request còn lại chờ
+chung kết quả đó thay vì tự gọi Goong.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+
+from cache import LRUCache
+from geocode_cache import normalize_address
+
+# Thời hạn mặc định của một response (giây)
+DEFAULT_TTL = 300
+
+
+def canonical_key(work_address, home_address, gym_address, max_scale):
+    """
+    Hash chuẩn của bộ tham số đầu vào.
+
+    Địa chỉ được chuẩn hóa như geocode cache nên các cách viết khác nhau của
+    cùng một địa chỉ dùng chung key.
+
+    Returns:
+        str: Chuỗi hex SHA-256
+    """
+    payload = json.dumps([
+        normalize_address(work_address),
+        normalize_address(home_address),
+        normalize_address(gym_address),
+        max_scale
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_etag(value):
+    """ETag (strong) tính từ nội dung response."""
+    body = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+class ResponseCache:
+    """
+    Cache response có TTL, kèm gộp các lần tính trùng key đang diễn ra.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_size=2048):
+        """
+        Args:
+            ttl (float): Thời hạn của một response (giây)
+            max_size (int): Số response tối đa trong cache
+        """
+        self.ttl = ttl
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    async def get_or_compute(self, key, compute):
+        """
+        Lấy response từ cache, hoặc tính mới nếu chưa có.
+
+        Nếu cùng key đang được tính, chờ kết quả của lần tính đó. Lỗi của lần
+        tính được trả cho mọi request đang chờ và không được cache.
+
+        Args:
+            key (str): Key từ canonical_key()
+            compute (callable): Coroutine function không tham số trả về response
+
+        Returns:
+            Response đã cache hoặc vừa tính
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('hits')
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self._count('misses')
+            task = asyncio.ensure_future(self._compute(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._count('coalesced')
+
+        # shield: một request bị hủy không hủy lần tính mà request khác đang chờ
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, compute):
+        value = await compute()
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        """
+        Thống kê của cache.
+
+        Returns:
+            dict: {'hits', 'misses', 'coalesced', 'hit_ratio', 'size', 'inflight'}
+        """
+        total = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_ratio': round((self.hits + self.coalesced) / total, 4) if total else 0.0,
+            'size': len(self.memory),
+            'inflight': len(self._inflight)
+        }
@@ -0,0 +1,210 @@
+"""
+Cache kết quả tuyến đường theo (origin, destination, vehicle).
+
+Tọa độ được làm tròn (hoặc đưa về ô geohash) trước khi làm key, nên các điểm
+gần như trùng nhau (cùng văn phòng, cùng phòng gym geocode lệch vài mét) dùng
+chung một kết quả.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from cache import LRUCache
+from shared_cache import SharedCache
+
+# Thời hạn mặc định của một kết quả route (1 ngày)
+DEFAULT_TTL = 24 * 3600
+
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat, lng, precision=7):
+    """
+    Mã hóa tọa độ thành geohash.
+
+    Args:
+        lat (float): Vĩ độ
+        lng (float): Kinh độ
+        precision (int): Số ký tự (7 ~ ô 150m, 8 ~ ô 40m)
+
+    Returns:
+        str: Geohash
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def snap_coordinate(coord, precision=4, geohash_precision=None):
+    """
+    Làm tròn tọa độ để các điểm gần nhau có cùng key.
+
+    Args:
+        coord: Tuple (lat, lng)
+        precision (int): Số chữ số thập phân giữ lại (4 ~ 11m)
+        geohash_precision (int): Nếu có, dùng ô geohash thay cho làm tròn
+
+    Returns:
+        Tuple (lat, lng) đã làm tròn, hoặc chuỗi geohash
+    """
+    lat, lng = coord
+    if geohash_precision:
+        return geohash_encode(lat, lng, geohash_precision)
+    return (round(lat, precision), round(lng, precision))
+
+
+class RouteCache:
+    """
+    Cache route trong bộ nhớ, giới hạn kích thước và có TTL, tùy chọn thêm tầng
+    SQLite trên đĩa dùng chung giữa các worker (xem SharedCache).
+    """
+
+    def __init__(self, precision=4, geohash_precision=None, ttl=DEFAULT_TTL,
+                 max_size=10000, symmetric_vehicles=(), path=None, shared_max_rows=None,
+                 namespace=None):
+        """
+        Args:
+            precision (int): Số chữ số thập phân khi làm tròn tọa độ
+            geohash_precision (int): Dùng ô geohash thay cho làm tròn nếu được đặt
+            ttl (float): Thời hạn của một kết quả (giây)
+            max_size (int): Số route tối đa trong cache
+            symmetric_vehicles (iterable): Các loại xe coi A->B ≈ B->A,
+                cho phép dùng kết quả chiều ngược lại
+            path (str): File SQLite dùng chung, None = chỉ cache trong bộ nhớ
+            shared_max_rows (int): Số route tối đa trong file chung, None = không giới hạn
+            namespace (str): Tiền tố key theo nguồn route (ví dụ 'local:hanoi_graph.npz'),
+                để kết quả của backend offline không lẫn với Goong trong file chung
+        """
+        self.precision = precision
+        self.geohash_precision = geohash_precision
+        self.symmetric_vehicles = set(symmetric_vehicles)
+        self.ttl = ttl
+        self.namespace = namespace
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self._lock = threading.Lock()
+        self.shared = SharedCache(path, 'route', max_rows=shared_max_rows) if path else None
+
+    def key(self, origin, destination, vehicle):
+        """Key cache của một route."""
+        key = (
+            snap_coordinate(origin, self.precision, self.geohash_precision),
+            snap_coordinate(destination, self.precision, self.geohash_precision),
+            vehicle
+        )
+        # Không có namespace thì giữ key cũ để dùng lại các dòng đã có trong file chung
+        return key if self.namespace is None else (self.namespace,) + key
+
+    def get(self, origin, destination, vehicle):
+        """
+        Lấy route đã lưu.
+
+        Returns:
+            dict: Route information, hoặc None nếu chưa có
+        """
+        keys = [self.key(origin, destination, vehicle)]
+        if vehicle in self.symmetric_vehicles:
+            keys.append(self.key(destination, origin, vehicle))
+
+        result = None
+        for key in keys:
+            result = self.memory.get(key)
+            if result is not None:
+                break
+
+        shared_hit = False
+        if result is None and self.shared is not None:
+            for key in keys:
+                row = self.shared.get(_shared_key(key))
+                if row is not None:
+                    result, expires_at = row
+                    self.memory.set(key, result, ttl=expires_at - time.time())
+                    shared_hit = True
+                    break
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.shared_hits += shared_hit
+
+        return result
+
+    def set(self, origin, destination, vehicle, route):
+        """Lưu route của một cặp điểm."""
+        self.set_many({(origin, destination): route}, vehicle)
+
+    def set_many(self, routes, vehicle):
+        """
+        Lưu nhiều route, ghi vào file chung trong một transaction.
+
+        Args:
+            routes (dict): {(origin, destination): route}
+            vehicle (str): Loại xe
+        """
+        items = self._set_memory(routes, vehicle)
+        if self.shared is not None:
+            self.shared.set_many(items, self.ttl)
+
+    async def aset_many(self, routes, vehicle):
+        """Như set_many, nhưng ghi file chung trong thread để không chặn event loop."""
+        items = self._set_memory(routes, vehicle)
+        if self.shared is not None and items:
+            await asyncio.to_thread(self.shared.set_many, items, self.ttl)
+
+    def _set_memory(self, routes, vehicle):
+        items = []
+        for (origin, destination), route in routes.items():
+            key = self.key(origin, destination, vehicle)
+            self.memory.set(key, route)
+            items.append((_shared_key(key), route))
+        return items
+
+    def stats(self):
+        """
+        Thống kê hit/miss của cache.
+
+        Returns:
+            dict: {'hits', 'misses', 'shared_hits', 'hit_ratio', 'size'};
+                  shared_hits là số hit đọc từ file chung (không có trong bộ nhớ)
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared_hits': self.shared_hits,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            'size': len(self.memory)
+        }
+
+
+def _shared_key(key):
+    """Key dạng chuỗi cho SharedCache, ví dụ '[[21.0288, 105.8523], [21.0051, 105.8433], "bike"]'."""
+    return json.dumps(key)
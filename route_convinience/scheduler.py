@@ -0,0 +1,292 @@
+"""
+Bộ điều phối các lần gọi Goong theo quota của từng API key.
+
+Mỗi API key có một token bucket (`rate` request/giây, dồn tối đa `burst`).
+Request chờ token trong hàng đợi ưu tiên: INTERACTIVE (/evaluate) luôn được
+gửi trước BATCH (/evaluate/batch, /evaluate/stream, /heatmap), nên job nền
+không làm chậm người dùng. Trong lúc chờ, các request DistanceMatrix cùng loại
+xe được gộp thành một lần gọi lớn hơn (trong giới hạn của Goong) để mỗi token
+làm được nhiều việc nhất.
+
+Độ ưu tiên được truyền qua contextvar:
+
+    with scheduling_priority(BATCH):
+        await calculator.evaluate_homes(...)
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+
+import httpx
+
+from matrix_planner import MAX_DESTINATIONS, MAX_ELEMENTS, MAX_ORIGINS
+from metrics import SCHEDULER_MERGED, SCHEDULER_WAIT
+
+INTERACTIVE = 0
+BATCH = 1
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch'}
+
+# Số lần gửi lại một request bị Goong trả 429
+MAX_RATE_LIMIT_RETRIES = 2
+
+current_priority = contextvars.ContextVar('goong_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def scheduling_priority(priority):
+    """Đặt độ ưu tiên cho mọi lần gọi Goong trong khối with (kể cả task con)."""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Token bucket: nạp `rate` token mỗi giây, tối đa `capacity` token.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """Số giây phải chờ tới khi có 1 token (0 nếu có ngay)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        """Rút hết token để tạm dừng khoảng `seconds` giây (sau khi bị 429)."""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class _Job:
+    __slots__ = ('priority', 'seq', 'kind', 'send', 'args', 'future', 'submitted', 'retries')
+
+    def __init__(self, priority, seq, kind, send, args):
+        self.priority = priority
+        self.seq = seq
+        self.kind = kind
+        self.send = send
+        self.args = args
+        self.future = asyncio.get_running_loop().create_future()
+        self.submitted = time.monotonic()
+        self.retries = 0
+
+    @property
+    def order(self):
+        return (self.priority, self.seq)
+
+
+class GoongScheduler:
+    """
+    Hàng đợi ưu tiên + token bucket cho các lần gọi Goong của một API key.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate (float): Số request tối đa mỗi giây
+            burst (int): Số request được gửi dồn khi bucket đầy (mặc định = rate)
+        """
+        self.bucket = TokenBucket(rate, burst or max(1, rate))
+        # Heap các (priority, seq, job): lấy job tiếp theo O(log n), không sắp xếp lại cả hàng đợi
+        self._pending = []
+        self._seq = itertools.count()
+        self._dispatcher = None
+        self._running = set()
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    async def call(self, send, priority=None):
+        """
+        Gửi một request không gộp được (ví dụ geocode) khi tới lượt.
+
+        Args:
+            send (callable): Coroutine function không tham số thực hiện request
+            priority (int): INTERACTIVE / BATCH, mặc định lấy từ scheduling_priority
+
+        Returns:
+            Kết quả của send(); lỗi của send() được ném lại cho người gọi
+        """
+        return await self._submit('call', send, (), priority)
+
+    async def matrix(self, origins, destinations, vehicle, send, priority=None):
+        """
+        Gửi một request DistanceMatrix, có thể được gộp với request khác đang chờ.
+
+        Args:
+            origins, destinations (list): Tọa độ (lat, lng)
+            vehicle (str): Loại xe
+            send (callable): Coroutine (origins, destinations, vehicle) -> response JSON
+            priority (int): INTERACTIVE / BATCH, mặc định lấy từ scheduling_priority
+
+        Returns:
+            dict: Response DistanceMatrix chỉ gồm các origins/destinations đã yêu cầu
+        """
+        args = ([tuple(o) for o in origins], [tuple(d) for d in destinations], vehicle)
+        return await self._submit('matrix', send, args, priority)
+
+    async def _submit(self, kind, send, args, priority):
+        if priority is None:
+            priority = current_priority.get()
+        job = _Job(priority, next(self._seq), kind, send, args)
+        self._push(job)
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        return await job.future
+
+    async def _dispatch(self):
+        while self._pending:
+            delay = self.bucket.delay()
+            if delay > 0:
+                # Job mới (có thể ưu tiên cao hơn) vẫn được xếp hàng trong lúc chờ
+                await asyncio.sleep(delay)
+                continue
+
+            job = heapq.heappop(self._pending)[-1]
+            if job.future.done():
+                continue
+
+            jobs = [job]
+            if job.kind == 'matrix':
+                jobs += self._take_mergeable(job)
+
+            self.bucket.take()
+            now = time.monotonic()
+            for queued in jobs:
+                SCHEDULER_WAIT.labels(PRIORITY_NAMES.get(queued.priority, str(queued.priority))).observe(
+                    now - queued.submitted
+                )
+            task = asyncio.create_task(self._execute(jobs))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _push(self, job):
+        heapq.heappush(self._pending, (*job.order, job))
+
+    def _take_mergeable(self, first):
+        """Lấy ra các request matrix đang chờ có thể gộp vào `first`, ưu tiên job tới lượt trước."""
+        origins, destinations, vehicle = first.args
+        origins, destinations = set(origins), set(destinations)
+        merged = []
+
+        candidates = sorted(
+            entry for entry in self._pending
+            if entry[-1].kind == 'matrix' and entry[-1].args[2] == vehicle and not entry[-1].future.done()
+        )
+        for entry in candidates:
+            job = entry[-1]
+            new_origins = origins.union(job.args[0])
+            new_destinations = destinations.union(job.args[1])
+            if (len(new_origins) <= MAX_ORIGINS and len(new_destinations) <= MAX_DESTINATIONS
+                    and len(new_origins) * len(new_destinations) <= MAX_ELEMENTS):
+                origins, destinations = new_origins, new_destinations
+                merged.append(job)
+
+        if merged:
+            taken = set(map(id, merged))
+            self._pending = [entry for entry in self._pending if id(entry[-1]) not in taken]
+            heapq.heapify(self._pending)
+            SCHEDULER_MERGED.inc(len(merged))
+        return merged
+
+    async def _execute(self, jobs):
+        first = jobs[0]
+        try:
+            if first.kind == 'call':
+                result = await first.send()
+                _resolve(first, result)
+                return
+
+            if len(jobs) == 1:
+                _resolve(first, await first.send(*first.args))
+                return
+
+            origins = list(dict.fromkeys(o for job in jobs for o in job.args[0]))
+            destinations = list(dict.fromkeys(d for job in jobs for d in job.args[1]))
+            response = await first.send(origins, destinations, first.args[2])
+
+            for job in jobs:
+                _resolve(job, _submatrix(response, origins, destinations, job.args[0], job.args[1]))
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                self._requeue_rate_limited(jobs, e)
+            else:
+                _fail(jobs, e)
+        except Exception as e:
+            _fail(jobs, e)
+
+    def _requeue_rate_limited(self, jobs, error):
+        """Bị 429: tạm dừng bucket theo Retry-After và xếp lại các job còn lượt thử."""
+        try:
+            retry_after = float(error.response.headers.get('Retry-After', ''))
+        except ValueError:
+            retry_after = 1.0
+        self.bucket.pause(retry_after)
+
+        for job in jobs:
+            if job.retries < MAX_RATE_LIMIT_RETRIES:
+                job.retries += 1
+                # Giữ seq cũ: job bị 429 vẫn đứng trước các job mới cùng độ ưu tiên
+                self._push(job)
+            elif not job.future.done():
+                job.future.set_exception(error)
+
+        if self._pending and (self._dispatcher is None or self._dispatcher.done()):
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+
+def _resolve(job, result):
+    if not job.future.done():
+        job.future.set_result(result)
+
+
+def _fail(jobs, error):
+    for job in jobs:
+        if not job.future.done():
+            job.future.set_exception(error)
+
+
+def _submatrix(response, origins, destinations, wanted_origins, wanted_destinations):
+    """Cắt từ response gộp phần ma trận ứng với một request con."""
+    if not response or 'rows' not in response:
+        return response
+
+    origin_index = {o: i for i, o in enumerate(origins)}
+    destination_index = {d: j for j, d in enumerate(destinations)}
+    rows = response['rows']
+
+    def element(i, j):
+        elements = rows[i].get('elements', []) if i < len(rows) else []
+        return elements[j] if j < len(elements) else None
+
+    return {
+        'rows': [
+            {'elements': [element(origin_index[o], destination_index[d]) for d in wanted_destinations]}
+            for o in wanted_origins
+        ]
+    }
@@ -0,0 +1,82 @@
+"""
+Tính điểm G/T dạng vector (NumPy) cho nhiều tổ hợp cùng lúc.
+
+Cùng công thức với calculate_points_G_n_T() nhưng nhận mảng, dùng cho xếp hạng
+hàng nghìn ứng viên mà không lặp từng bộ số.
+"""
+
+import numpy as np
+
+
+def calculate_points_G_n_T_array(dis_workhome, time_workhome, dis_homegym, time_homegym,
+                                 dis_workgym, time_workgym, max_scale=5, clip=True):
+    """
+    Tính điểm đánh giá cho mảng các bộ khoảng cách/thời gian.
+
+    Các bộ không hợp lệ (NaN, giá trị âm, mẫu số bằng 0) cho kết quả NaN thay
+    vì ném ZeroDivisionError.
+
+    Args:
+        dis_workhome, time_workhome: Mảng khoảng cách (km) / thời gian (phút) Work -> Home
+        dis_homegym, time_homegym: Mảng khoảng cách / thời gian Home -> Gym
+        dis_workgym, time_workgym: Mảng (hoặc số) khoảng cách / thời gian Work -> Gym
+        max_scale: Thang điểm tối đa
+        clip (bool): Giới hạn evaluation ở max_scale như main()
+
+    Returns:
+        tuple: (evaluation, G, T, dRate, tRate), mỗi phần tử là np.ndarray
+    """
+    d_wh, t_wh, d_hg, t_hg, d_wg, t_wg = np.broadcast_arrays(*(
+        np.asarray(x, dtype=float)
+        for x in (dis_workhome, time_workhome, dis_homegym, time_homegym, dis_workgym, time_workgym)
+    ))
+
+    d_denominator = d_wg + d_hg
+    t_denominator = t_wg + t_hg
+
+    with np.errstate(invalid='ignore'):
+        valid = (
+            np.isfinite(d_wh) & np.isfinite(t_wh)
+            & np.isfinite(d_denominator) & np.isfinite(t_denominator)
+            & (d_wh >= 0) & (t_wh >= 0)
+            & (d_denominator > 0) & (t_denominator > 0)
+        )
+
+    dRate = np.divide(d_wh, d_denominator, out=np.full(d_wh.shape, np.nan), where=valid)
+    tRate = np.divide(t_wh, t_denominator, out=np.full(t_wh.shape, np.nan), where=valid)
+
+    G = max_scale * dRate
+    T = max_scale * tRate
+
+    evaluation = (0.65 * G) + (0.35 * T)
+    if clip:
+        evaluation = np.minimum(evaluation, max_scale)
+
+    return evaluation, G, T, dRate, tRate
+
+
+def top_k(ratings, k):
+    """
+    Lấy chỉ số của k phần tử có điểm cao nhất, không sắp xếp toàn bộ mảng.
+
+    Phần tử NaN (không hợp lệ) bị bỏ qua.
+
+    Args:
+        ratings: Mảng điểm
+        k (int): Số phần tử cần lấy
+
+    Returns:
+        np.ndarray: Chỉ số theo thứ tự điểm giảm dần
+    """
+    ratings = np.asarray(ratings, dtype=float)
+    candidates = np.flatnonzero(~np.isnan(ratings))
+    if k <= 0 or candidates.size == 0:
+        return np.empty(0, dtype=int)
+
+    values = ratings[candidates]
+    if k < candidates.size:
+        partition = np.argpartition(-values, k - 1)[:k]
+        candidates = candidates[partition]
+        values = values[partition]
+
+    return candidates[np.argsort(-values, kind='stable')]
@@ -0,0 +1,152 @@
+"""
+Cache key-value trên đĩa dùng chung giữa các worker process.
+
+Khi chạy api.py với nhiều worker uvicorn/gunicorn, cache trong bộ nhớ của mỗi
+worker là riêng biệt: tỉ lệ hit giảm theo số worker và phải làm nóng lại sau
+mỗi lần khởi động. SharedCache lưu vào một file SQLite ở chế độ WAL, nên nhiều
+process đọc cùng lúc không chặn nhau và không chặn người ghi; các lần ghi
+đồng thời chờ nhau tối đa `busy_timeout` thay vì lỗi "database is locked".
+
+Ghi nhiều dòng nên dùng set_many (một transaction), và từ code async thì gọi
+qua asyncio.to_thread để việc chờ khóa không chặn event loop.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+# Thời gian chờ tối đa khi file đang bị process khác ghi (giây)
+DEFAULT_BUSY_TIMEOUT = 5.0
+
+# Chu kỳ dọn các dòng hết hạn / vượt max_rows (giây)
+DEFAULT_PRUNE_INTERVAL = 300
+
+
+class SharedCache:
+    """
+    Một bảng (key, value JSON, expires_at) trong file SQLite chế độ WAL.
+
+    Mỗi thread dùng connection riêng nên không cần lock trong process.
+    """
+
+    def __init__(self, path, table, busy_timeout=DEFAULT_BUSY_TIMEOUT, max_rows=None,
+                 prune_interval=DEFAULT_PRUNE_INTERVAL):
+        """
+        Args:
+            path (str): Đường dẫn file SQLite (nhiều bảng có thể dùng chung một file)
+            table (str): Tên bảng, ví dụ 'geocode' hoặc 'route'
+            busy_timeout (float): Thời gian chờ khi file đang bị khóa (giây)
+            max_rows (int): Số dòng tối đa, dòng sắp hết hạn nhất bị xóa trước; None = không giới hạn
+            prune_interval (float): Chu kỳ dọn bảng khi có ghi (giây)
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+
+        self.path = path
+        self.table = table
+        self.busy_timeout = busy_timeout
+        self.max_rows = max_rows
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._last_prune = time.monotonic()
+
+        db = self._connect()
+        db.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        db.execute(f'CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)')
+        self.prune()
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # isolation_level=None: mỗi câu lệnh tự commit, không giữ khóa ghi lâu
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            # WAL + NORMAL: không fsync mỗi lần ghi, vẫn an toàn khi process bị kill
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        """
+        Lấy giá trị còn hạn.
+
+        Returns:
+            tuple: (value, expires_at), hoặc None nếu không có hoặc đã hết hạn
+        """
+        try:
+            row = self._connect().execute(
+                f'SELECT value, expires_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Lỗi khi đọc shared cache ({self.table}): {str(e)}")
+            return None
+
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl):
+        """
+        Lưu giá trị (ghi đè nếu đã có).
+
+        Args:
+            key (str): Key
+            value: Giá trị JSON-serializable
+            ttl (float): Thời hạn (giây)
+        """
+        self.set_many([(key, value)], ttl)
+
+    def set_many(self, items, ttl):
+        """
+        Lưu nhiều giá trị trong một transaction (chỉ chờ khóa ghi một lần).
+
+        Args:
+            items (iterable): Các cặp (key, value)
+            ttl (float): Thời hạn (giây)
+        """
+        expires_at = time.time() + ttl
+        rows = [(key, json.dumps(value, ensure_ascii=False), expires_at) for key, value in items]
+        if not rows:
+            return
+
+        db = self._connect()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                db.executemany(
+                    f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)', rows
+                )
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"Lỗi khi ghi shared cache ({self.table}): {str(e)}")
+            return
+
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self.prune()
+
+    def prune(self):
+        """Xóa các dòng hết hạn và các dòng vượt max_rows."""
+        self._last_prune = time.monotonic()
+        db = self._connect()
+        try:
+            db.execute(f'DELETE FROM {self.table} WHERE expires_at <= ?', (time.time(),))
+            if self.max_rows:
+                db.execute(
+                    f'DELETE FROM {self.table} WHERE key IN ('
+                    f'SELECT key FROM {self.table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_rows,)
+                )
+        except sqlite3.Error as e:
+            print(f"Lỗi khi dọn shared cache ({self.table}): {str(e)}")
+
+    def __len__(self):
+        return self._connect().execute(
+            f'SELECT COUNT(*) FROM {self.table} WHERE expires_at > ?', (time.time(),)
+        ).fetchone()[0]
@@ -0,0 +1,101 @@
+"""
+Đánh giá lô lớn dạng streaming (NDJSON) với worker pool giới hạn.
+
+Đầu vào được tách dần từng dòng, tối đa `concurrency` phần tử được xử lý cùng
+lúc và kết quả được trả ra ngay khi xong. Các hàng đợi đều có giới hạn nên số
+kết quả giữ trong bộ nhớ không tăng theo kích thước lô, và client đọc chậm sẽ
+làm chậm việc xử lý.
+"""
+
+import asyncio
+import json
+
+_DONE = object()
+
+
+async def iter_ndjson(chunks):
+    """
+    Tách luồng bytes NDJSON thành từng object.
+
+    Args:
+        chunks: Async iterator các khối bytes
+
+    Yields:
+        tuple: (index, item) với item là dict, hoặc (index, ValueError) nếu dòng
+               không phải JSON object hợp lệ
+    """
+    buffer = b''
+    index = 0
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            if line.strip():
+                yield index, _parse_line(line)
+                index += 1
+
+    if buffer.strip():
+        yield index, _parse_line(buffer)
+
+
+def _parse_line(line):
+    try:
+        item = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return ValueError(f"Invalid JSON: {e}")
+    if not isinstance(item, dict):
+        return ValueError("Each line must be a JSON object")
+    return item
+
+
+async def run_bounded(items, worker, concurrency=16):
+    """
+    Chạy worker trên từng phần tử với số lượng đồng thời giới hạn.
+
+    Args:
+        items: Async iterator các phần tử đầu vào
+        worker (callable): Coroutine function(item) -> kết quả; không nên ném lỗi,
+            lỗi của từng phần tử nên được trả về như một kết quả
+        concurrency (int): Số worker chạy đồng thời
+
+    Yields:
+        Kết quả theo thứ tự hoàn thành
+    """
+    inbox = asyncio.Queue(maxsize=concurrency * 2)
+    outbox = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def produce():
+        try:
+            async for item in items:
+                await inbox.put(item)
+        finally:
+            for _ in range(concurrency):
+                await inbox.put(_DONE)
+
+    async def consume():
+        try:
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    break
+                await outbox.put(await worker(item))
+        finally:
+            # Worker ném lỗi vẫn phải báo xong, nếu không vòng đọc kết quả chờ mãi
+            await outbox.put(_DONE)
+
+    tasks = [asyncio.create_task(produce())]
+    tasks += [asyncio.create_task(consume()) for _ in range(concurrency)]
+
+    finished = 0
+    try:
+        while finished < concurrency:
+            result = await outbox.get()
+            if result is _DONE:
+                finished += 1
+                continue
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
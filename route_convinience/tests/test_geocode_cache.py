@@ -0,0 +1,53 @@
+import sys
+import unicodedata
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from geocode_cache import GeocodeCache, normalize_address  # noqa: E402
+
+
+@pytest.mark.parametrize('a, b', [
+    ('285 Khuất Duy Tiến, Hà Nội', '285  khuất duy tiến hà nội'),
+    (unicodedata.normalize('NFD', 'Cầu Giấy'), 'Cầu Giấy'),
+    # Vị trí dấu thanh kiểu cũ / mới
+    ('Hòa Bình', 'Hoà Bình'),
+    ('Khỏe', 'Khoẻ'),
+    ('Thủy Lợi', 'Thuỷ Lợi'),
+    # Viết tắt không nhập nhằng
+    ('Q.1, TP.HCM', 'Quận 1, Thành phố Hồ Chí Minh'),
+    ('P.12, Q. Bình Thạnh', 'Phường 12, Quận Bình Thạnh'),
+    ('Ngõ 5 Đ. Láng', 'Ngõ 5 Đường Láng'),
+])
+def test_same_address(a, b):
+    assert normalize_address(a) == normalize_address(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    # Dấu tiếng Việt làm đổi nghĩa
+    ('Phố Hàng Bạc', 'Phố Hàng Bác'),
+    ('Ngõ 5 Đ. Láng', 'Ngõ 5 Dương Láng'),
+    ('Mùa Xuân', 'Muà Xuân'),
+    # "P." không kèm số có thể là Phố hoặc Phường
+    ('12 P. Láng Hạ', '12 Phường Láng Hạ'),
+    ('12 P. Láng Hạ', '12 Phố Láng Hạ'),
+])
+def test_different_address(a, b):
+    assert normalize_address(a) != normalize_address(b)
+
+
+def test_keeps_house_number_separators():
+    assert normalize_address('213/12-A Nguyễn Gia Trí') == '213/12-a nguyễn gia trí'
+
+
+def test_memory_cache_hits_normalized_variants():
+    cache = GeocodeCache()
+    location = {'address': 'Hồ Gươm', 'lat': 21.0287, 'lng': 105.8522}
+    cache.set('Hồ Gươm, Hà Nội', location)
+
+    assert cache.get('hồ gươm  hà nội') == location
+    assert cache.get('Hồ Gươm, Hà Nam') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
@@ -0,0 +1,147 @@
+import asyncio
+import math
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from matrix_planner import MAX_DESTINATIONS, MAX_ELEMENTS, MAX_ORIGINS, MatrixPlanner  # noqa: E402
+
+WORK = (21.0285, 105.8542)
+GYM = (21.0136, 105.8266)
+
+
+def plan(pairs, **limits):
+    planner = MatrixPlanner(**limits)
+    planner.add_many(pairs)
+    return planner, planner.plan()
+
+
+def assert_valid(planner, batches, max_origins=MAX_ORIGINS, max_destinations=MAX_DESTINATIONS,
+                 max_elements=MAX_ELEMENTS):
+    covered = set()
+    for origins, destinations in batches:
+        assert 0 < len(origins) <= max_origins
+        assert 0 < len(destinations) <= max_destinations
+        assert len(origins) * len(destinations) <= max_elements
+        assert len(set(origins)) == len(origins)
+        assert len(set(destinations)) == len(destinations)
+        covered.update((o, d) for o in origins for d in destinations)
+    assert set(planner.pairs) <= covered
+
+
+def fake_fetch(origins, destinations):
+    """Ma trận giả: route của (o, d) ghi lại chính cặp đó."""
+    return [[{'pair': (o, d)} for d in destinations] for o in origins]
+
+
+def test_empty():
+    assert plan([])[1] == []
+
+
+def test_three_points_single_request():
+    a, b, c = (1.0, 1.0), (2.0, 2.0), (3.0, 3.0)
+    planner, batches = plan([(a, b), (b, c), (a, c)])
+    assert batches == [([a, b], [b, c])]
+
+
+def test_duplicate_pairs_counted_once():
+    planner, _ = plan([(WORK, GYM), (WORK, GYM)])
+    assert planner.pairs == [(WORK, GYM)]
+
+
+def test_homogeneous_homes():
+    homes = [(21.0 + i / 1000, 105.8) for i in range(200)]
+    pairs = [(h, WORK) for h in homes] + [(h, GYM) for h in homes] + [(WORK, GYM)]
+    planner, batches = plan(pairs)
+
+    assert_valid(planner, batches)
+    # 201 origins, tối đa 25 origins mỗi request
+    assert len(batches) == math.ceil(201 / MAX_ORIGINS)
+
+
+def test_heterogeneous_destination_sets_are_packed_together():
+    rng = random.Random(1)
+    destinations = [(20.0, 105.0 + i / 100) for i in range(10)]
+    origins = [(21.0 + i / 1000, 105.8) for i in range(30)]
+    pairs = [(o, d) for o in origins for d in rng.sample(destinations, 3)]
+    planner, batches = plan(pairs)
+
+    assert_valid(planner, batches)
+    # 30 origins x 10 destinations = 300 ô, mỗi request tối đa 100 ô
+    assert len(batches) == 3
+
+
+def test_origin_with_many_destinations_is_split():
+    origin = (21.0, 105.8)
+    pairs = [(origin, (20.0, 105.0 + i / 100)) for i in range(60)]
+    planner, batches = plan(pairs)
+
+    assert_valid(planner, batches)
+    assert len(batches) == math.ceil(60 / MAX_DESTINATIONS)
+
+
+@pytest.mark.parametrize('limits', [
+    {},
+    {'max_origins': 10, 'max_destinations': 10, 'max_elements': 30},
+    {'max_origins': 25, 'max_destinations': 25, 'max_elements': 10},
+])
+def test_random_pairs_respect_limits(limits):
+    rng = random.Random(7)
+    points = [(21.0 + i / 1000, 105.8) for i in range(80)]
+    pairs = [(rng.choice(points), rng.choice(points)) for _ in range(1500)]
+    planner, batches = plan(pairs, **limits)
+
+    assert_valid(planner, batches, **limits)
+    if not limits:
+        # Gom chéo các origin: ít request hơn mỗi origin một request
+        assert len(batches) < len({origin for origin, _ in planner.pairs})
+
+
+def test_execute_scatters_results_to_pairs():
+    homes = [(21.0 + i / 1000, 105.8) for i in range(40)]
+    pairs = [(h, WORK) for h in homes] + [(WORK, GYM)]
+    planner, batches = plan(pairs)
+    calls = []
+
+    def fetch(origins, destinations):
+        calls.append((origins, destinations))
+        return fake_fetch(origins, destinations)
+
+    results = planner.execute(fetch)
+
+    assert len(calls) == len(batches)
+    assert list(results) == planner.pairs
+    assert all(route == {'pair': pair} for pair, route in results.items())
+
+
+def test_execute_async_matches_execute():
+    homes = [(21.0 + i / 1000, 105.8) for i in range(60)]
+    planner, _ = plan([(h, WORK) for h in homes] + [(h, GYM) for h in homes])
+
+    async def fetch(origins, destinations):
+        return fake_fetch(origins, destinations)
+
+    assert asyncio.run(planner.execute_async(fetch)) == planner.execute(fake_fetch)
+
+
+def test_scatter_failed_request_gives_none():
+    planner, batches = plan([(WORK, GYM), (GYM, WORK)])
+    origins, destinations = batches[0]
+
+    assert planner.scatter(origins, destinations, None) == {(WORK, GYM): None, (GYM, WORK): None}
+    # Response thiếu hàng / phần tử
+    rows = fake_fetch(origins, destinations)[:1]
+    rows[0] = rows[0][:1]
+    results = planner.scatter(origins, destinations, rows)
+    first = (origins[0], destinations[0])
+    assert results == {pair: ({'pair': pair} if pair == first else None) for pair in planner.pairs}
+
+
+def test_scatter_skips_unrequested_pairs():
+    planner, _ = plan([(WORK, GYM)])
+    results = planner.scatter([WORK, GYM], [GYM, WORK], fake_fetch([WORK, GYM], [GYM, WORK]))
+    assert results == {(WORK, GYM): {'pair': (WORK, GYM)}}
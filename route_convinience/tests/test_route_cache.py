@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from route_cache import RouteCache, geohash_encode, snap_coordinate  # noqa: E402
+
+HO_GUOM = (21.0287, 105.8522)
+ROUTE = {'distance': 1200, 'duration': 300}
+
+
+def test_geohash_known_values():
+    # Giá trị tham chiếu của thuật toán geohash chuẩn
+    assert geohash_encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert geohash_encode(42.6, -5.6, 5) == 'ezs42'
+
+
+def test_geohash_prefix_and_neighbourhood():
+    assert geohash_encode(*HO_GUOM, 8).startswith(geohash_encode(*HO_GUOM, 6))
+    # Cách ~5 m thường cùng ô 7 ký tự (~150 m)
+    assert geohash_encode(21.02870, 105.85220, 7) == geohash_encode(21.02874, 105.85223, 7)
+
+
+def test_snap_coordinate():
+    assert snap_coordinate((21.028749, 105.852249)) == (21.0287, 105.8522)
+    assert snap_coordinate((21.028749, 105.852249), precision=2) == (21.03, 105.85)
+    assert snap_coordinate(HO_GUOM, geohash_precision=7) == geohash_encode(*HO_GUOM, 7)
+
+
+def test_nearby_points_share_route():
+    cache = RouteCache()
+    cache.set((21.02871, 105.85221), (21.0136, 105.8266), 'bike', ROUTE)
+
+    assert cache.get((21.02869, 105.85219), (21.01361, 105.82659), 'bike') == ROUTE
+    assert cache.get((21.02871, 105.85221), (21.0136, 105.8266), 'car') is None
+
+
+def test_reverse_direction_only_for_symmetric_vehicles():
+    a, b = HO_GUOM, (21.0136, 105.8266)
+
+    cache = RouteCache()
+    cache.set(a, b, 'bike', ROUTE)
+    assert cache.get(b, a, 'bike') is None
+
+    symmetric = RouteCache(symmetric_vehicles=['bike'])
+    symmetric.set(a, b, 'bike', ROUTE)
+    assert symmetric.get(b, a, 'bike') == ROUTE
+    assert symmetric.get(b, a, 'car') is None
+
+
+def test_namespaces_do_not_share_routes(tmp_path):
+    path = str(tmp_path / 'routes.sqlite3')
+    a, b = HO_GUOM, (21.0136, 105.8266)
+
+    goong = RouteCache(path=path)
+    goong.set(a, b, 'bike', ROUTE)
+
+    local = RouteCache(path=path, namespace='local:hanoi_graph.npz')
+    assert local.get(a, b, 'bike') is None
+    local.set(a, b, 'bike', {'distance': 1000, 'duration': 250})
+
+    assert RouteCache(path=path).get(a, b, 'bike') == ROUTE
+    assert RouteCache(path=path, namespace='local:hanoi_graph.npz').get(a, b, 'bike')['distance'] == 1000
@@ -0,0 +1,143 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calculator_registry import CalculatorRegistry  # noqa: E402
+from scheduler import BATCH, INTERACTIVE, MAX_RATE_LIMIT_RETRIES, GoongScheduler  # noqa: E402
+
+A, B, C = (21.0, 105.8), (21.1, 105.9), (21.2, 106.0)
+
+
+def matrix_response(origins, destinations):
+    return {'rows': [{'elements': [{'origin': o, 'destination': d} for d in destinations]} for o in origins]}
+
+
+def rate_limited(retry_after='0'):
+    request = httpx.Request('GET', 'https://rsapi.goong.io/DistanceMatrix')
+    response = httpx.Response(429, headers={'Retry-After': retry_after}, request=request)
+    return httpx.HTTPStatusError('429 Too Many Requests', request=request, response=response)
+
+
+def test_interactive_jobs_go_first():
+    order = []
+
+    def send(name):
+        async def run():
+            order.append(name)
+            return name
+        return run
+
+    async def main():
+        scheduler = GoongScheduler(rate=1000, burst=10)
+        # Cùng một lượt event loop: mọi job đã vào hàng đợi trước khi dispatcher chạy
+        return await asyncio.gather(
+            scheduler.call(send('batch-1'), BATCH),
+            scheduler.call(send('batch-2'), BATCH),
+            scheduler.call(send('interactive-1'), INTERACTIVE),
+            scheduler.call(send('interactive-2'), INTERACTIVE),
+        )
+
+    assert asyncio.run(main()) == ['batch-1', 'batch-2', 'interactive-1', 'interactive-2']
+    assert order == ['interactive-1', 'interactive-2', 'batch-1', 'batch-2']
+
+
+def test_matrix_requests_are_merged_per_vehicle():
+    sent = []
+
+    async def send(origins, destinations, vehicle):
+        sent.append((origins, destinations, vehicle))
+        return matrix_response(origins, destinations)
+
+    async def main():
+        scheduler = GoongScheduler(rate=1000, burst=10)
+        return await asyncio.gather(
+            scheduler.matrix([A], [B], 'bike', send),
+            scheduler.matrix([A], [C], 'bike', send, priority=BATCH),
+            scheduler.matrix([B], [C], 'car', send),
+        )
+
+    first, second, car = asyncio.run(main())
+
+    assert len(sent) == 2
+    assert sent[0] == ([A], [B, C], 'bike')
+    assert sent[1] == ([B], [C], 'car')
+    # Mỗi người gọi chỉ nhận phần ma trận của mình
+    assert first == matrix_response([A], [B])
+    assert second == matrix_response([A], [C])
+    assert car == matrix_response([B], [C])
+
+
+def test_rate_limited_request_is_retried():
+    calls = []
+
+    async def send():
+        calls.append(1)
+        if len(calls) == 1:
+            raise rate_limited()
+        return 'ok'
+
+    async def main():
+        scheduler = GoongScheduler(rate=100, burst=1)
+        return await asyncio.wait_for(scheduler.call(send), 5)
+
+    assert asyncio.run(main()) == 'ok'
+    assert len(calls) == 2
+
+
+def test_rate_limited_request_gives_up():
+    calls = []
+
+    async def send():
+        calls.append(1)
+        raise rate_limited()
+
+    async def main():
+        scheduler = GoongScheduler(rate=100, burst=1)
+        return await asyncio.wait_for(scheduler.call(send), 5)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(main())
+    assert len(calls) == MAX_RATE_LIMIT_RETRIES + 1
+
+
+def test_requeued_job_keeps_its_place():
+    order = []
+
+    async def main():
+        scheduler = GoongScheduler(rate=100, burst=1)
+
+        async def flaky():
+            order.append('flaky')
+            if order.count('flaky') == 1:
+                # Trong lúc bị 429, một job batch mới vào hàng đợi
+                asyncio.get_running_loop().call_soon(
+                    lambda: asyncio.ensure_future(scheduler.call(later, BATCH))
+                )
+                await asyncio.sleep(0)
+                raise rate_limited()
+            return 'flaky'
+
+        async def later():
+            order.append('later')
+
+        await asyncio.wait_for(scheduler.call(flaky, BATCH), 5)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert order == ['flaky', 'flaky', 'later']
+
+
+def test_scheduler_survives_calculator_eviction():
+    registry = CalculatorRegistry(client=None, max_size=1, rate_limit=5)
+
+    scheduler = registry.get('key-a').scheduler
+    registry.get('key-b')
+
+    assert registry.get('key-a').scheduler is scheduler
+    assert registry.get('key-b').scheduler is not scheduler
+    assert CalculatorRegistry(client=None).get('key-a').scheduler is None
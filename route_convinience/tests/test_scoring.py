@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from get_3_point import calculate_points_G_n_T  # noqa: E402
+from scoring import calculate_points_G_n_T_array, top_k  # noqa: E402
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_array_matches_scalar(seed):
+    rng = np.random.default_rng(seed)
+    n = 200
+    d_wh, d_hg = rng.uniform(0.1, 30, n), rng.uniform(0.1, 30, n)
+    t_wh, t_hg = rng.uniform(1, 90, n), rng.uniform(1, 90, n)
+    d_wg, t_wg = rng.uniform(0.1, 30), rng.uniform(1, 90)
+
+    arrays = calculate_points_G_n_T_array(d_wh, t_wh, d_hg, t_hg, d_wg, t_wg, max_scale=10, clip=False)
+
+    for i in range(n):
+        expected = calculate_points_G_n_T(d_wh[i], t_wh[i], d_hg[i], t_hg[i], d_wg, t_wg, max_scale=10)
+        assert [a[i] for a in arrays] == pytest.approx(expected)
+
+
+def test_clip_to_max_scale():
+    evaluation, G, *_ = calculate_points_G_n_T_array([100, 1], [100, 1], [1, 1], [1, 1], 1, 1)
+
+    assert evaluation[0] == 5
+    assert G[0] > 5
+    assert evaluation[1] == pytest.approx(0.65 * 2.5 + 0.35 * 2.5)
+
+
+def test_invalid_rows_are_nan():
+    nan = float('nan')
+    evaluation, G, T, dRate, tRate = calculate_points_G_n_T_array(
+        [1, nan, 1, -1, 1],
+        [1, 1, 1, 1, 1],
+        [1, 1, 0, 1, 1],
+        [1, 1, 0, 1, nan],
+        [1, 1, 0, 1, 1],
+        [1, 1, 0, 1, 1],
+    )
+
+    assert not np.isnan(evaluation[0])
+    for values in (evaluation, G, T, dRate, tRate):
+        assert np.isnan(values[1:]).all()
+
+
+def test_top_k_order_and_nan():
+    nan = float('nan')
+    ratings = [2.0, nan, 4.5, 1.0, nan, 4.8, 3.0]
+
+    assert top_k(ratings, 3).tolist() == [5, 2, 6]
+    assert top_k(ratings, 10).tolist() == [5, 2, 6, 0, 3]
+    assert top_k(ratings, 0).tolist() == []
+    assert top_k([nan, nan], 2).tolist() == []
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(7)
+    ratings = rng.uniform(0, 5, 1000)
+    ratings[rng.choice(1000, 100, replace=False)] = np.nan
+
+    expected = [i for i in np.argsort(-ratings, kind='stable') if not np.isnan(ratings[i])][:25]
+    assert top_k(ratings, 25).tolist() == expected
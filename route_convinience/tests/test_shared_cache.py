@@ -0,0 +1,123 @@
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import shared_cache  # noqa: E402
+from shared_cache import SharedCache  # noqa: E402
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(shared_cache.time, 'time', clock)
+    return clock
+
+
+def raw_rows(path, table):
+    with sqlite3.connect(path) as db:
+        return dict(db.execute(f'SELECT key, expires_at FROM {table}').fetchall())
+
+
+def test_get_set_roundtrip(tmp_path, clock):
+    cache = SharedCache(str(tmp_path / 'cache.sqlite3'), 'geocode')
+    cache.set('hồ gươm', {'lat': 21.0287, 'lng': 105.8522, 'address': 'Hồ Gươm'}, ttl=60)
+
+    value, expires_at = cache.get('hồ gươm')
+    assert value == {'lat': 21.0287, 'lng': 105.8522, 'address': 'Hồ Gươm'}
+    assert expires_at == clock.now + 60
+    assert cache.get('missing') is None
+
+
+def test_expired_values_are_not_returned(tmp_path, clock):
+    cache = SharedCache(str(tmp_path / 'cache.sqlite3'), 'route')
+    cache.set('a', 1, ttl=10)
+
+    clock.now += 9.9
+    assert cache.get('a')[0] == 1
+    clock.now += 0.1
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_set_many_overwrites_and_is_visible_to_other_instances(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite3')
+    writer = SharedCache(path, 'route')
+    writer.set('a', 'old', ttl=60)
+    writer.set_many([('a', 'new'), ('b', [1, 2])], ttl=120)
+
+    # Một instance khác (như worker khác) đọc cùng file
+    reader = SharedCache(path, 'route')
+    assert reader.get('a') == ('new', clock.now + 120)
+    assert reader.get('b')[0] == [1, 2]
+    assert len(reader) == 2
+
+
+def test_tables_are_separate(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite3')
+    SharedCache(path, 'geocode').set('k', 'geocode', ttl=60)
+    assert SharedCache(path, 'route').get('k') is None
+
+
+def test_prune_removes_expired_rows(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SharedCache(path, 'route')
+    cache.set_many([('short', 1)], ttl=10)
+    cache.set_many([('long', 2)], ttl=100)
+
+    clock.now += 50
+    assert set(raw_rows(path, 'route')) == {'short', 'long'}
+    cache.prune()
+    assert set(raw_rows(path, 'route')) == {'long'}
+
+
+def test_max_rows_keeps_latest_expiring(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SharedCache(path, 'route', max_rows=3)
+    for i in range(6):
+        cache.set(f'k{i}', i, ttl=100 + i)
+
+    cache.prune()
+    assert set(raw_rows(path, 'route')) == {'k3', 'k4', 'k5'}
+
+
+def test_writes_prune_periodically(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SharedCache(path, 'route', max_rows=2, prune_interval=0)
+    for i in range(5):
+        cache.set(f'k{i}', i, ttl=100 + i)
+
+    assert set(raw_rows(path, 'route')) == {'k3', 'k4'}
+
+
+def test_concurrent_writers(tmp_path):
+    cache = SharedCache(str(tmp_path / 'cache.sqlite3'), 'route')
+
+    def write(worker):
+        for i in range(50):
+            cache.set_many([(f'{worker}-{i}-{j}', j) for j in range(5)], ttl=60)
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cache) == 4 * 50 * 5
+
+
+def test_invalid_table_name(tmp_path):
+    with pytest.raises(ValueError):
+        SharedCache(str(tmp_path / 'cache.sqlite3'), 'route; DROP TABLE geocode')
@@ -0,0 +1,66 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from stream_evaluator import iter_ndjson, run_bounded  # noqa: E402
+
+
+async def aiter(values):
+    for value in values:
+        yield value
+
+
+async def collect(items):
+    return [item async for item in items]
+
+
+def test_iter_ndjson_lines_split_across_chunks():
+    chunks = [b'{"a": 1}\n{"a"', b': 2}\n\nnot json\n', b'[1]\n{"a": 3}']
+    items = asyncio.run(collect(iter_ndjson(aiter(chunks))))
+
+    assert [index for index, _ in items] == [0, 1, 2, 3, 4]
+    assert items[0][1] == {'a': 1}
+    assert items[1][1] == {'a': 2}
+    assert isinstance(items[2][1], ValueError)
+    assert isinstance(items[3][1], ValueError)
+    assert items[4][1] == {'a': 3}
+
+
+def test_run_bounded_limits_concurrency():
+    running = 0
+    peak = 0
+
+    async def worker(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return item * 2
+
+    results = asyncio.run(collect(run_bounded(aiter(range(50)), worker, concurrency=4)))
+
+    assert sorted(results) == [i * 2 for i in range(50)]
+    assert peak == 4
+
+
+def test_run_bounded_finishes_when_worker_raises():
+    async def worker(item):
+        if item == 3:
+            raise RuntimeError('boom')
+        return item
+
+    async def main():
+        return await asyncio.wait_for(collect(run_bounded(aiter(range(10)), worker, concurrency=2)), 5)
+
+    # Worker lỗi dừng lại, worker còn lại xử lý nốt các phần tử khác
+    assert sorted(asyncio.run(main())) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+
+
+@pytest.mark.parametrize('concurrency', [1, 8])
+def test_run_bounded_empty_input(concurrency):
+    assert asyncio.run(collect(run_bounded(aiter([]), lambda item: item, concurrency))) == []
@@ -0,0 +1,184 @@
+import asyncio
+import sys
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from playwright_crawl import CrawlResult, Deadline, GoogleMapsCrawler, run_until  # noqa: E402
+
+# Trang giả chạy nhanh gấp 10 lần thời gian chờ thật
+TIME_SCALE = 0.1
+
+# Sai số cho phép khi so thời gian chạy với budget (giây)
+SLACK = 0.3
+
+
+class FakeElement:
+    def __init__(self, src=''):
+        self.src = src
+
+    async def get_attribute(self, name):
+        return self.src if name == 'src' else None
+
+    async def click(self):
+        pass
+
+    async def fill(self, text):
+        pass
+
+    async def press(self, key):
+        pass
+
+
+class FakePage:
+    """Trang Google Maps giả: mọi lần chờ đều tốn thời gian, ảnh mới hiện dần khi scroll."""
+
+    def __init__(self, hang_search=False, time_scale=TIME_SCALE):
+        self.hang_search = hang_search
+        self.time_scale = time_scale
+        self.loaded = 0
+
+    async def goto(self, url, **kwargs):
+        pass
+
+    async def wait_for_timeout(self, ms):
+        await asyncio.sleep(ms / 1000 * self.time_scale)
+
+    async def wait_for_selector(self, selector, timeout=60000):
+        if self.hang_search and selector == '[role="main"]':
+            # Kết quả tìm kiếm không hiện: Playwright chờ hết timeout rồi báo lỗi
+            await asyncio.sleep(timeout / 1000)
+            raise TimeoutError(f'Timeout {timeout}ms exceeded')
+        return FakeElement()
+
+    async def query_selector_all(self, selector):
+        if selector == 'button[jsaction*="photo"]':
+            return [FakeElement()]
+        if selector == 'img':
+            self.loaded += 1
+            return [FakeElement(f'https://lh5.googleusercontent.com/p/AF1QipTest{i}=w203-h152-k-no')
+                    for i in range(self.loaded)]
+        return []
+
+    async def query_selector(self, selector):
+        return FakeElement()
+
+    async def evaluate(self, script):
+        if 'gallery' in script:
+            # Scroll gallery chậm: hết giờ rơi vào đây, trong khối try/except của vòng scroll
+            await asyncio.sleep(5 * self.time_scale)
+
+
+def make_crawler(page, downloaded):
+    crawler = GoogleMapsCrawler(http_first=False)
+    crawler.browser = object()  # launch_browser() coi như browser đã mở
+    crawler.page = page
+
+    def download_images(urls, output_dir, address, deadline=None):
+        downloaded.extend(urls)
+        return CrawlResult(len(urls))
+
+    crawler.download_images = download_images
+    return crawler
+
+
+def run_crawl(crawler, budget_ms):
+    started = time.monotonic()
+    result = asyncio.run(crawler.crawl('Hồ Gươm', max_images=20, budget_ms=budget_ms))
+    return result, time.monotonic() - started
+
+
+def test_search_timeout_returns_partial_within_budget():
+    downloaded = []
+    crawler = make_crawler(FakePage(hang_search=True), downloaded)
+
+    result, elapsed = run_crawl(crawler, budget_ms=3000)
+
+    assert result == 0
+    assert result.partial
+    assert elapsed < 3.0 + SLACK
+    assert downloaded == []
+
+
+def test_extraction_timeout_keeps_found_images():
+    downloaded = []
+    crawler = make_crawler(FakePage(), downloaded)
+
+    result, elapsed = run_crawl(crawler, budget_ms=4000)
+
+    assert result.partial
+    assert elapsed < 4.0 + SLACK
+    # Ảnh tìm được trước khi hết giờ vẫn được tải
+    assert 0 < len(downloaded) < 20
+    assert result == len(downloaded)
+
+
+def test_without_budget_is_not_partial():
+    downloaded = []
+    page = FakePage()
+    crawler = make_crawler(page, downloaded)
+
+    async def no_wait(*args):
+        pass
+
+    page.wait_for_timeout = no_wait
+    page.evaluate = no_wait
+    result, _ = run_crawl(crawler, budget_ms=None)
+
+    assert not result.partial
+    assert len(downloaded) == 15
+
+
+def test_small_budget_is_not_spent_on_fixed_waits():
+    downloaded = []
+    # Thời gian thật: riêng các lần chờ cố định khi tìm kiếm (3 s + 5 s) đã vượt budget
+    crawler = make_crawler(FakePage(time_scale=1), downloaded)
+
+    result, elapsed = run_crawl(crawler, budget_ms=3000)
+
+    assert elapsed < 3.0 + SLACK
+    assert result > 0
+    assert result == len(downloaded)
+
+
+class FakePlaywright:
+    started = 0
+    stopped = 0
+
+    def __init__(self):
+        self.chromium = self
+
+    async def start(self):
+        FakePlaywright.started += 1
+        return self
+
+    async def launch(self, **kwargs):
+        # Chromium khởi động rất chậm
+        await asyncio.sleep(60)
+
+    async def stop(self):
+        FakePlaywright.stopped += 1
+
+
+def test_cancelled_launch_stops_driver(monkeypatch):
+    module = types.ModuleType('playwright.async_api')
+    module.async_playwright = FakePlaywright
+    monkeypatch.setitem(sys.modules, 'playwright', types.ModuleType('playwright'))
+    monkeypatch.setitem(sys.modules, 'playwright.async_api', module)
+    monkeypatch.setattr(FakePlaywright, 'started', 0)
+    monkeypatch.setattr(FakePlaywright, 'stopped', 0)
+
+    crawler = GoogleMapsCrawler(http_first=False)
+
+    async def main():
+        for _ in range(2):
+            done, _ = await run_until(crawler.launch_browser(), Deadline(50))
+            assert not done
+            assert (crawler.playwright, crawler.browser, crawler.page) == (None, None, None)
+
+    asyncio.run(main())
+    assert FakePlaywright.started == FakePlaywright.stopped == 2
@@ -0,0 +1,78 @@
+import queue
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import crawl_pool  # noqa: E402
+from playwright_crawl import CrawlResult  # noqa: E402
+
+
+class FakeCrawler:
+    """Crawler giả: không mở browser, close() có thể ném lỗi."""
+
+    close_error = None
+    closed = 0
+
+    def __init__(self, **kwargs):
+        pass
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        FakeCrawler.closed += 1
+        if FakeCrawler.close_error:
+            raise FakeCrawler.close_error
+
+    async def crawl(self, address, max_images, output_dir, budget_ms=None):
+        if address == 'boom':
+            raise RuntimeError('boom')
+        return CrawlResult(len(address))
+
+
+@pytest.fixture
+def fake_crawler(monkeypatch):
+    monkeypatch.setattr(crawl_pool, 'GoogleMapsCrawler', FakeCrawler)
+    monkeypatch.setattr(FakeCrawler, 'close_error', None)
+    monkeypatch.setattr(FakeCrawler, 'closed', 0)
+    return FakeCrawler
+
+
+def run_worker(addresses, recycle_after=100):
+    tasks, results = queue.Queue(), queue.Queue()
+    for address in addresses:
+        tasks.put(address)
+    tasks.put(None)
+
+    crawl_pool._worker_main(0, tasks, results, max_images=5, output_dir='images', headless=True,
+                            recycle_after=recycle_after, max_rss_mb=None, transcode=None,
+                            http_first=True, budget_ms=None)
+
+    messages = []
+    while not results.empty():
+        messages.append(results.get())
+    return messages
+
+
+def test_worker_reports_results_and_clean_exit(fake_crawler):
+    messages = run_worker(['a', 'boom', 'ccc'])
+
+    results = [m for m in messages if m['type'] == 'result']
+    assert [(m['address'], m['count'], m['error']) for m in results] == [
+        ('a', 1, None), ('boom', 0, 'boom'), ('ccc', 3, None)
+    ]
+    assert messages[-1] == {'type': 'done', 'worker': 0, 'clean': True}
+
+
+def test_failing_close_still_counts_as_clean_exit(fake_crawler):
+    fake_crawler.close_error = RuntimeError('browser already gone')
+
+    messages = run_worker(['a', 'bb', 'ccc'], recycle_after=2)
+
+    # Lỗi close khi recycle và khi thoát đều không làm worker bị coi là crash
+    assert len([m for m in messages if m['type'] == 'result']) == 3
+    assert fake_crawler.closed == 2
+    assert messages[-1] == {'type': 'done', 'worker': 0, 'clean': True}
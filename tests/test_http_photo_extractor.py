@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+sys.path.insert(0, str(ROOT))
+
+import http_photo_extractor  # noqa: E402
+from http_photo_extractor import extract_photo_urls, fetch_photo_urls, unescape_payload  # noqa: E402
+
+
+def load(name):
+    return (FIXTURES / name).read_text(encoding='utf-8')
+
+
+def test_place_page_photos_and_street_view():
+    urls = extract_photo_urls(load('maps_place.html'))
+
+    assert urls == [
+        'https://lh3.googleusercontent.com/p/AF1QipN1hoGuom_Main-Photo=w2048-h2048-k-no',
+        'https://lh3.googleusercontent.com/p/AF1QipOsecond_PhotoXyz=w2048-h2048-k-no',
+        'https://streetviewpixels-pa.googleapis.com/v1/thumbnail?panoid=CAoSLEFGMVFpcE5fUGFub0lk'
+        '&cb_client=maps_sv.tactile.gps&w=1200&h=600&yaw=185&pitch=0&thumbfov=100',
+        'https://lh3.googleusercontent.com/p/AF1QipThird-360-Photo=w2048-h2048-k-no-pi-0-ya96.5-ro-0-fo100',
+        'https://lh3.googleusercontent.com/gps-cs-s/AC9h4nFourthPhoto=w2048-h2048-k-no',
+    ]
+
+
+def test_avatars_are_skipped():
+    urls = extract_photo_urls(load('maps_place.html'))
+    assert not any('/a-/' in url or '/a/' in url for url in urls)
+
+
+def test_max_images():
+    assert len(extract_photo_urls(load('maps_place.html'), max_images=2)) == 2
+
+
+def test_page_without_photos():
+    assert extract_photo_urls(load('maps_no_photos.html')) == []
+
+
+def test_falls_back_to_whole_page_without_init_state():
+    assert extract_photo_urls(load('maps_escaped_only.html')) == [
+        'https://lh3.googleusercontent.com/p/AF1QipEscaped-Only=w2048-h2048-k-no',
+    ]
+
+
+@pytest.mark.parametrize('escaped', [
+    r'https:\/\/lh5.googleusercontent.com\/p\/X=w80',
+    r'https:\\/\\/lh5.googleusercontent.com\\/p\\/X\\u003dw80',
+])
+def test_unescape_payload(escaped):
+    assert unescape_payload(escaped) == 'https://lh5.googleusercontent.com/p/X=w80'
+
+
+def test_fetch_errors_return_empty(monkeypatch):
+    def fail(*args, **kwargs):
+        raise ConnectionError('offline')
+
+    monkeypatch.setattr(http_photo_extractor, 'fetch_place_page', fail)
+    assert fetch_photo_urls('Hồ Gươm') == []
+
+
+def test_views_of_360_photo_are_not_merged():
+    html = ('<script>window.APP_INITIALIZATION_STATE=['
+            '"https://lh5.googleusercontent.com/p/AF1Qip360\\u003dw203-h100-k-no-pi-0-ya96.5-ro-0-fo100",'
+            '"https://lh5.googleusercontent.com/p/AF1Qip360\\u003dw408-h200-k-no-pi-0-ya96.5-ro-0-fo100",'
+            '"https://lh5.googleusercontent.com/p/AF1Qip360\\u003dw203-h100-k-no-pi-10-ya200-ro-0-fo100"'
+            '];window.APP_FLAGS=[];</script>')
+    assert extract_photo_urls(html) == [
+        'https://lh3.googleusercontent.com/p/AF1Qip360=w2048-h2048-k-no-pi-0-ya96.5-ro-0-fo100',
+        'https://lh3.googleusercontent.com/p/AF1Qip360=w2048-h2048-k-no-pi-10-ya200-ro-0-fo100',
+    ]
@@ -0,0 +1,53 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import image_transcode  # noqa: E402
+from image_transcode import check_transcode, transcode_image  # noqa: E402
+
+
+def make_png(path, size=(64, 48)):
+    Image = pytest.importorskip('PIL.Image')
+    # Ảnh nhiễu để bản PNG gốc lớn hơn bản WebP nén lại
+    img = Image.effect_noise(size, 64).convert('RGB')
+    img.save(path, 'PNG')
+
+
+def test_transcode_to_webp(tmp_path):
+    src = tmp_path / 'photo_001.jpg'  # đuôi sai, nội dung là PNG
+    make_png(src, (800, 600))
+
+    meta = transcode_image(str(src), 'webp', max_dimension=400)
+
+    assert meta['original_format'] == 'png'
+    assert meta['transcoded'] is True
+    assert meta['file'] == 'photo_001.webp'
+    assert (meta['output_width'], meta['output_height']) == (400, 300)
+    assert not src.exists()
+    assert (tmp_path / 'photo_001.webp').stat().st_size == meta['bytes'] < meta['original_bytes']
+
+
+def test_without_pillow_only_fixes_extension(tmp_path, monkeypatch):
+    src = tmp_path / 'photo_001.jpg'
+    make_png(src)
+    monkeypatch.setattr(image_transcode, 'Image', None)
+
+    meta = transcode_image(str(src), 'webp')
+
+    assert meta['transcoded'] is False
+    assert meta['file'] == 'photo_001.png'
+    assert meta['bytes'] == meta['original_bytes']
+    json.dumps(meta)
+
+
+def test_check_transcode(monkeypatch):
+    with pytest.raises(ValueError):
+        check_transcode('gif')
+
+    monkeypatch.setattr(image_transcode, 'Image', None)
+    with pytest.raises(RuntimeError, match='Pillow'):
+        check_transcode('webp')
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from photo_url import canonicalize_photo_url  # noqa: E402
+
+STREETVIEW = ('https://streetviewpixels-pa.googleapis.com/v1/thumbnail?panoid=CAoSLEFGMVFp'
+              '&cb_client=maps_sv.tactile.gps&w=203&h=100&yaw={yaw}&pitch={pitch}&thumbfov=100')
+
+
+def streetview_key(yaw, pitch=0):
+    return canonicalize_photo_url(STREETVIEW.format(yaw=yaw, pitch=pitch)).key
+
+
+@pytest.mark.parametrize('a, b', [
+    (184.5, 184.53),
+    (184.5, 185.4),
+    (183.5, 184.49),
+    (359.6, 0),
+    (-0.4, 0),
+])
+def test_streetview_yaw_buckets(a, b):
+    assert streetview_key(a) == streetview_key(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    (184.49, 184.5),
+    (185.5, 184.5),
+])
+def test_streetview_yaw_bucket_boundaries(a, b):
+    assert streetview_key(a) != streetview_key(b)
+
+
+def test_streetview_pitch_rounds_half_up():
+    assert streetview_key(90, pitch=2.5) == streetview_key(90, pitch=3.2)
+    assert streetview_key(90, pitch=-2.5) == streetview_key(90, pitch=-2)
+    assert 'pitch=3' in canonicalize_photo_url(STREETVIEW.format(yaw=90, pitch=2.5)).url